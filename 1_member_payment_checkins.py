@@ -6,18 +6,21 @@ Created on Sat Mar 15 19:54:57 2025
 @author: xinmengyang
 """
 
+import os
+import sys
+import json
+import math
 import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from faker import Faker
 import pandas as pd
 import numpy as np
+from simulation_config import START_DATE, END_DATE
 
 fake = Faker()
 
-# Constants
-START_DATE = datetime(2022, 1, 1)
-END_DATE = datetime(2024, 12, 31, 23, 59, 59)
-
 generated_emails = set()
 generated_phones = set()
 
@@ -58,6 +61,95 @@ def generate_unique_uk_phone_number():
             generated_phones.add(phone)
             return str(phone)
 
+# --- Bulk identifier allocation ---
+EMAIL_DOMAINS = ['gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com', 'icloud.com']
+EMAIL_ALPHABET = np.array(list('abcdefghijklmnopqrstuvwxyz0123456789'))
+EMAIL_PREFIX_LENGTH = 6      # unique part of the username, 36**6 ~ 2.2 billion values
+EMAIL_MAX_SUFFIX_LENGTH = 6  # random padding so usernames stay 6-12 characters
+PHONE_DIGITS = 9             # digits after the '07' mobile prefix
+
+class PermutedCounter:
+    """
+    Hand out distinct integers from [0, radix**digits) in a scrambled order.
+
+    Counter value i goes through an affine map (a * i + c) mod space, a reversal
+    of its base-`radix` digits and a second affine map. Each step is a bijection
+    (gcd(a, space) == 1), so values never repeat and the only state kept is the
+    counter itself. The maps run in int64 while a * i + c cannot overflow it, and
+    in (slower) Python ints for larger spaces, where int64 would wrap and break
+    the bijection.
+    """
+
+    def __init__(self, radix, digits):
+        self.radix = radix
+        self.digits = digits
+        self.space = radix ** digits
+        self.affine_maps = [self.random_affine_map() for _ in range(2)]
+        max_product = max(a * (self.space - 1) + c for a, c in self.affine_maps)
+        self.dtype = np.int64 if max_product < 2 ** 63 else object
+        self.next_index = 0
+
+    def random_affine_map(self):
+        multiplier = random.randrange(self.space // 3, self.space)
+        while math.gcd(multiplier, self.space) != 1:
+            multiplier += 1
+        return multiplier, random.randrange(self.space)
+
+    def take(self, n):
+        """Return the next n values as an int64 array (object array of ints for large spaces)."""
+        if self.next_index + n > self.space:
+            raise ValueError(f"Only {self.space - self.next_index} unique values left, {n} requested")
+        values = np.arange(self.next_index, self.next_index + n).astype(self.dtype)
+        self.next_index += n
+
+        (a1, c1), (a2, c2) = self.affine_maps
+        values = (values * a1 + c1) % self.space
+        place_values = np.array([self.radix ** i for i in range(self.digits)], dtype=self.dtype)
+        digit_matrix = (values[:, None] // place_values) % self.radix
+        values = digit_matrix @ place_values[::-1]
+        return (values * a2 + c2) % self.space
+
+email_counter = None
+phone_counter = None
+
+def allocate_unique_emails(n):
+    """
+    Allocate n unique emails in one call, without retries or a set of issued emails.
+
+    The first EMAIL_PREFIX_LENGTH characters of the username encode a permuted
+    counter in base 36, so usernames are unique whatever random suffix and
+    domain follow. Do not mix with generate_unique_email in the same run.
+    """
+    global email_counter
+    if email_counter is None:
+        email_counter = PermutedCounter(len(EMAIL_ALPHABET), EMAIL_PREFIX_LENGTH)
+
+    values = email_counter.take(n)
+    place_values = len(EMAIL_ALPHABET) ** np.arange(EMAIL_PREFIX_LENGTH - 1, -1, -1, dtype=np.int64)
+    prefix = EMAIL_ALPHABET[(values[:, None] // place_values) % len(EMAIL_ALPHABET)]
+
+    suffix = EMAIL_ALPHABET[np.random.randint(0, len(EMAIL_ALPHABET), size=(n, EMAIL_MAX_SUFFIX_LENGTH))]
+    suffix_lengths = np.random.randint(0, EMAIL_MAX_SUFFIX_LENGTH + 1, size=n)
+    suffix[np.arange(EMAIL_MAX_SUFFIX_LENGTH)[None, :] >= suffix_lengths[:, None]] = ''
+
+    # Empty trailing characters are dropped when the rows are viewed as whole strings
+    username_chars = np.ascontiguousarray(np.concatenate([prefix, suffix], axis=1))
+    usernames = username_chars.view(f'<U{EMAIL_PREFIX_LENGTH + EMAIL_MAX_SUFFIX_LENGTH}').ravel()
+    domains = np.char.add('@', np.random.choice(EMAIL_DOMAINS, size=n))
+    return np.char.add(usernames, domains).astype(object)
+
+def allocate_unique_uk_phone_numbers(n):
+    """
+    Allocate n unique UK mobile numbers ('07' + 9 digits) in one call, without retries.
+    Do not mix with generate_unique_uk_phone_number in the same run.
+    """
+    global phone_counter
+    if phone_counter is None:
+        phone_counter = PermutedCounter(10, PHONE_DIGITS)
+
+    digits = np.char.zfill(phone_counter.take(n).astype(str), PHONE_DIGITS)
+    return np.char.add('07', digits).astype(object)
+
 def generate_left_skewed_birth_date(start_date, end_date, skew_strength=5):
     """
     Generate left-skewed date_of_birth between start_date and end_date.
@@ -78,10 +170,94 @@ def generate_left_skewed_birth_date(start_date, end_date, skew_strength=5):
 
     return start_date + timedelta(days=skewed_day)
 
-def generate_members_by_branch(branches_df, min_members=250, max_members=400):
+def generate_long_tail_dates(start_date, end_date, size):
+    """
+    Array version of generate_long_tail_date: draw `size` join dates in one call.
+    """
+    days_range = (end_date - start_date).days
+    long_tail_days = np.random.exponential(scale=days_range / 3.0, size=size).astype(np.int64)
+    long_tail_days = np.minimum(long_tail_days, days_range)
+    return pd.Timestamp(start_date) + pd.to_timedelta(long_tail_days, unit='D')
+
+def generate_left_skewed_birth_dates(start_date, end_date, size, skew_strength=5):
+    """
+    Array version of generate_left_skewed_birth_date: draw `size` birth dates in one call.
+    """
+    days_range = (end_date - start_date).days
+    rand = np.random.beta(1, skew_strength, size=size)
+    skewed_days = (rand * days_range).astype(np.int64)
+    return pd.Timestamp(start_date) + pd.to_timedelta(skewed_days, unit='D')
+
+def build_name_pools(pool_size=5000):
+    """
+    Draw pools of Faker names once so batched generation can sample them by index.
+    """
+    return {
+        'M': np.array([fake.first_name_male() for _ in range(pool_size)], dtype=object),
+        'F': np.array([fake.first_name_female() for _ in range(pool_size)], dtype=object),
+        'last': np.array([fake.last_name() for _ in range(pool_size)], dtype=object),
+    }
+
+def generate_members_batched(branches_df, min_members=250, max_members=400, name_pools=None):
+    """
+    Generate members for each branch, drawing every column of a branch as a NumPy array.
+    Same schema and distributions as the per-row loop, without per-member Python calls
+    (names are sampled from a pool of Faker names).
+    """
+    if name_pools is None:
+        name_pools = build_name_pools()
+
+    branch_frames = []
+    member_id = 1
+
+    for branch in branches_df.itertuples(index=False):
+        num_members = random.randint(min_members, max_members)
+
+        genders = np.random.choice(np.array(['M', 'F'], dtype=object), size=num_members)
+        first_names = np.where(
+            genders == 'M',
+            np.random.choice(name_pools['M'], size=num_members),
+            np.random.choice(name_pools['F'], size=num_members)
+        )
+        last_names = np.random.choice(name_pools['last'], size=num_members)
+        dates_of_birth = generate_left_skewed_birth_dates(
+            start_date=datetime(1945, 1, 1),
+            end_date=datetime(2005, 12, 31),
+            size=num_members,
+            skew_strength=4
+        )
+        branch_opening_date = pd.to_datetime(branch.opening_date)
+        join_dates = generate_long_tail_dates(branch_opening_date, END_DATE, num_members)
+        emails = allocate_unique_emails(num_members)
+        phones = allocate_unique_uk_phone_numbers(num_members)
+
+        branch_frames.append(pd.DataFrame({
+            "member_id": np.arange(member_id, member_id + num_members),
+            "branch_id": branch.branch_id,
+            "first_name": first_names,
+            "last_name": last_names,
+            "date_of_birth": dates_of_birth,
+            "gender": genders,
+            "email": emails,
+            "phone": phones,
+            "join_date": join_dates
+        }))
+
+        member_id += num_members
+
+    if not branch_frames:
+        return pd.DataFrame()
+    return pd.concat(branch_frames, ignore_index=True)
+
+def generate_members_by_branch(branches_df, min_members=250, max_members=400, batched=False):
     """
     Generate members for each branch.
+
+    batched: build each branch column-wise with generate_members_batched instead of one dict per member.
     """
+    if batched:
+        return generate_members_batched(branches_df, min_members, max_members)
+
     members = []
     member_id = 1
 
@@ -120,10 +296,99 @@ def generate_members_by_branch(branches_df, min_members=250, max_members=400):
     members_df = pd.DataFrame(members)
     return members_df
 
-def generate_payments_by_members(members_df, memberships_df):
+def generate_payments_batched(members_df, memberships_df):
+    """
+    Array version of generate_payments_by_members.
+
+    Each member's renewal chain length is drawn from the geometric distribution
+    implied by renewal_probability, membership types are picked by index into
+    arrays of duration and price, and end dates follow from a cumulative sum of
+    (gap before start + duration) along each chain. A chain is cut at its first
+    renewal paid after END_DATE, exactly like the loop's break.
+    """
+    num_members = len(members_df)
+    if num_members == 0:
+        return pd.DataFrame()
+
+    payment_methods = ['Credit Card', 'Cash', 'Paypal', 'Debit Card']
+    first_payment_weights = [0.29, 0.13, 0.24, 0.34]
+
+    # --- Chain layout: one first payment plus a geometric number of renewals per member ---
+    renewal_probability = np.random.uniform(0.7, 0.8, size=num_members)
+    chain_lengths = np.random.geometric(1 - renewal_probability)
+    total = int(chain_lengths.sum())
+    chain_starts = np.cumsum(chain_lengths) - chain_lengths
+    member_index = np.repeat(np.arange(num_members), chain_lengths)
+    is_first = np.zeros(total, dtype=bool)
+    is_first[chain_starts] = True
+
+    # --- Membership type, price and payment method per payment ---
+    type_index = np.random.randint(0, len(memberships_df), size=total)
+    durations = memberships_df['membership_duration'].to_numpy(dtype=np.int64)[type_index]
+    prices = memberships_df['membership_price'].to_numpy()[type_index]
+    membership_ids = memberships_df['membership_type_id'].to_numpy()[type_index]
+    payment_method = np.where(
+        is_first,
+        np.random.choice(payment_methods, size=total, p=first_payment_weights),
+        np.random.choice(payment_methods, size=total)
+    )
+
+    # --- Renewal payment date relative to the previous end date, in days ---
+    # On time: -7..29, as Faker's date_between_dates excludes a midnight end bound
+    on_time = np.random.random(total) < 0.8
+    payment_offset = np.where(
+        on_time,
+        np.random.randint(-7, 30, size=total),
+        np.random.randint(30, 181, size=total)
+    )
+    start_offset = np.maximum(payment_offset, 1)  # max(current_end + 1 day, payment_date)
+    end_increment = np.where(is_first, 0, start_offset + durations)
+
+    cumulative = np.cumsum(end_increment)
+    days_after_first_end = cumulative - np.repeat(cumulative[chain_starts], chain_lengths)
+
+    join_dates = pd.to_datetime(members_df['join_date']).to_numpy(dtype='datetime64[ns]')
+    first_start = np.minimum(join_dates, np.datetime64(END_DATE, 'ns'))[member_index]
+    first_end = first_start + durations[chain_starts][member_index].astype('timedelta64[D]')
+
+    end_dates = first_end + days_after_first_end.astype('timedelta64[D]')
+    previous_end = end_dates - end_increment.astype('timedelta64[D]')
+    payment_dates = np.where(is_first, first_start, previous_end + payment_offset.astype('timedelta64[D]'))
+    start_dates = np.where(is_first, first_start, previous_end + start_offset.astype('timedelta64[D]'))
+
+    # --- Cut each chain at its first renewal paid after END_DATE ---
+    late = ~is_first & (payment_dates > np.datetime64(END_DATE, 'ns'))
+    late_count = np.cumsum(late)
+    late_before_chain = np.repeat(late_count[chain_starts] - late[chain_starts], chain_lengths)
+    keep = (late_count - late_before_chain) == 0
+
+    start_dates = np.minimum(start_dates, np.datetime64(END_DATE, 'ns'))
+    end_dates = start_dates + durations.astype('timedelta64[D]')
+
+    payments_df = pd.DataFrame({
+        "payment_id": 0,
+        "member_id": members_df['member_id'].to_numpy()[member_index],
+        "membership_id": membership_ids,
+        "start_date": start_dates,
+        "end_date": end_dates,
+        "payment_date": payment_dates,
+        "payment_amount": prices,
+        "payment_method": payment_method,
+        "branch_id": members_df['branch_id'].to_numpy()[member_index],
+        "duration_days": durations
+    })[keep].reset_index(drop=True)
+    payments_df['payment_id'] = np.arange(1, len(payments_df) + 1)
+    return payments_df
+
+def generate_payments_by_members(members_df, memberships_df, batched=False):
     """
     Generate payments for members linked to their branch.
+
+    batched: simulate all renewal chains at once with generate_payments_batched.
     """
+    if batched:
+        return generate_payments_batched(members_df, memberships_df)
+
     payments = []
     payment_id = 1
 
@@ -206,18 +471,151 @@ def generate_payments_by_members(members_df, memberships_df):
     payments_df = pd.DataFrame(payments)
     return payments_df
 
-def generate_check_ins_by_payments(payments_df):
+# --- Default check-in behaviour, tweaked per branch in BranchBehaviourModel.for_branch ---
+MONTH_MULTIPLIERS = [1.3, 1.3, 1.2, 0.9, 1.1, 1.2, 0.7, 0.7, 1.1, 1.0, 0.8, 0.8]  # January .. December
+WEEKDAY_MULTIPLIERS = [1.2, 1.1, 1.1, 1.0, 0.7, 0.9, 1.0]  # Monday .. Sunday
+SEASONAL_NOISE = (0.90, 1.08)
+CHECK_IN_SLOTS = [  # (first hour, last hour, weight)
+    (6, 8, 10),    # Morning
+    (9, 11, 8),    # Mid morning
+    (11, 13, 12),  # Lunch time
+    (14, 17, 15),  # Afternoon
+    (18, 21, 40),  # Evening
+    (21, 23, 10),  # Late evening
+    (0, 5, 5)      # Night owls
+]
+
+class BranchBehaviourModel:
+    """
+    Check-in behaviour of one branch, compiled once into NumPy lookup tables:
+    month and weekday activity multipliers and cumulative time-slot weights.
+    """
+
+    def __init__(self, month_multipliers, weekday_multipliers, slots, seasonal_noise=SEASONAL_NOISE):
+        self.month_multipliers = np.concatenate([[1.0], np.asarray(month_multipliers, dtype=float)])  # indexed by month number
+        self.weekday_multipliers = np.asarray(weekday_multipliers, dtype=float)
+        slots = np.asarray(slots, dtype=np.int64)
+        self.slot_first_hours = slots[:, 0]
+        self.slot_hour_counts = slots[:, 1] - slots[:, 0] + 1
+        self.slot_cumulative_weights = np.cumsum(slots[:, 2]).astype(float)
+        self.seasonal_noise = tuple(seasonal_noise)
+
+    @classmethod
+    def for_branch(cls, branch_id, profile=None):
+        """
+        Build the model for branch_id: the chain defaults with the built-in branch
+        differences, with any keys of profile (e.g. loaded by load_behaviour_profiles) taking precedence.
+        """
+        noise_low, noise_high = SEASONAL_NOISE
+        if branch_id in [4, 5]:
+            noise_low, noise_high = noise_low * 1.08, noise_high * 1.08
+        elif branch_id in [6, 7]:
+            noise_low, noise_high = noise_low * 0.90, noise_high * 0.90
+
+        weekday_multipliers = list(WEEKDAY_MULTIPLIERS)
+        if branch_id in [3, 7]:
+            weekday_multipliers[5] *= 1.1
+            weekday_multipliers[6] *= 1.1
+        elif branch_id == 1:
+            weekday_multipliers[4] *= 1.2
+
+        slots = [list(slot) for slot in CHECK_IN_SLOTS]
+        if branch_id in [1, 4]:
+            slots[4][2] += 5  # Evening even more busy
+        elif branch_id == 7:
+            slots[5][2] += 5  # Late evening activity
+
+        profile = profile or {}
+        return cls(
+            month_multipliers=profile.get("month_multipliers", MONTH_MULTIPLIERS),
+            weekday_multipliers=profile.get("weekday_multipliers", weekday_multipliers),
+            slots=profile.get("slots", slots),
+            seasonal_noise=profile.get("seasonal_noise", (noise_low, noise_high))
+        )
+
+    def seasonal_multiplier(self, date, rng=random):
+        """Month multiplier with branch-specific noise."""
+        return self.month_multipliers[date.month] * rng.uniform(*self.seasonal_noise)
+
+    def weekday_multiplier(self, date):
+        """Day-of-week multiplier for a single date."""
+        return self.weekday_multipliers[date.weekday()]
+
+    def weekday_weights(self, days):
+        """Day-of-week multipliers for an array of datetime64[D] dates."""
+        weekdays = (np.asarray(days, dtype='datetime64[D]').astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+        return self.weekday_multipliers[weekdays]
+
+    def sample_check_in_times(self, visit_dates, np_rng=np.random):
+        """Draw one peak/off-peak check-in time per visit date, returned as datetime64[s]."""
+        days = np.asarray(visit_dates, dtype='datetime64[D]')
+        n = len(days)
+        total_weight = self.slot_cumulative_weights[-1]
+        slot = np.searchsorted(self.slot_cumulative_weights, np_rng.random(n) * total_weight, side='right')
+        hours = self.slot_first_hours[slot] + (np_rng.random(n) * self.slot_hour_counts[slot]).astype(np.int64)
+        minutes = np_rng.randint(0, 4, size=n) * 15
+        seconds = np_rng.randint(0, 60, size=n)
+        offsets = hours * 3600 + minutes * 60 + seconds
+        return days.astype('datetime64[s]') + offsets.astype('timedelta64[s]')
+
+def load_behaviour_profiles(path):
+    """
+    Load per-branch behaviour profiles from a JSON file of the form
+    {"<branch_id>": {"month_multipliers": [...12], "weekday_multipliers": [...7],
+                     "slots": [[first_hour, last_hour, weight], ...], "seasonal_noise": [low, high]}}.
+    Every key is optional.
+    """
+    with open(path) as f:
+        profiles = json.load(f)
+    return {int(branch_id): profile for branch_id, profile in profiles.items()}
+
+CHECK_IN_COLUMNS = ["check_in_id", "member_id", "check_in_time", "check_out_time", "overall_rating", "branch_id"]
+CHECK_IN_CHUNK_SIZE = 500_000
+
+def draw_branch_null_probabilities(rng=random):
+    """
+    Draw the branch-specific probability that a check-in has no rating.
+    """
+    return {branch_id: rng.uniform(0.5, 0.6) for branch_id in range(1, 8)}
+
+def draw_visit_days(start_date, end_date, num_visits, behaviour_model, np_rng=np.random):
+    """
+    Array version of the candidate-date oversampling: draw num_visits * 2 day offsets
+    between start_date and end_date, weight them by weekday and sample num_visits of
+    them. Like Faker's date_between_dates, a midnight end_date is excluded and an
+    end_date with a time of day (e.g. END_DATE) includes that day. Returns the
+    distinct visit days as datetime64[D] and how many visits fell on each.
+    """
+    first_day = np.datetime64(pd.Timestamp(start_date).date(), 'D')
+    span = max(1, math.ceil((pd.Timestamp(end_date) - pd.Timestamp(first_day)) / pd.Timedelta(days=1)))
+
+    candidate_offsets = np_rng.randint(0, span, size=num_visits * 2)
+    weights = behaviour_model.weekday_weights(first_day + candidate_offsets)
+    chosen_offsets = np_rng.choice(candidate_offsets, size=num_visits, p=weights / weights.sum())
+
+    visit_counts = np.bincount(chosen_offsets, minlength=span)
+    visit_offsets = np.flatnonzero(visit_counts)
+    return first_day + visit_offsets, visit_counts[visit_offsets]
+
+def iter_check_ins_by_payments(payments_df, chunk_size=CHECK_IN_CHUNK_SIZE, branch_null_probability=None,
+                               behaviour_profiles=None, batched=False, rng=random, np_rng=np.random, faker=fake):
     """
     Generate non-overlapping check-ins for each payment record, linked to the member and branch.
     Adds seasonality, weekday variations, and time slot peak patterns, with branch-specific differences.
+
+    Yields DataFrames of roughly chunk_size rows, cut at member boundaries, so the full
+    check-in table never has to be held in memory. check_in_id runs on across chunks.
+    branch_null_probability is drawn here unless given (parallel shards share one draw).
+    behaviour_profiles optionally overrides the per-branch BranchBehaviourModel settings.
+    batched: draw visit dates with draw_visit_days instead of one Faker call per candidate date.
+    rng, np_rng and faker are the random sources (random, np.random and fake by default).
     """
-    check_ins = []
+    check_ins = {column: [] for column in CHECK_IN_COLUMNS}
     check_in_id = 1
 
     # --- Branch-specific null rating probabilities ---
-    branch_null_probability = {
-        branch_id: random.uniform(0.5, 0.6) for branch_id in range(1, 8)
-    }
+    if branch_null_probability is None:
+        branch_null_probability = draw_branch_null_probabilities(rng)
 
     # --- Branch-specific rating distributions ---
     branch_rating_distribution = {
@@ -230,79 +628,14 @@ def generate_check_ins_by_payments(payments_df):
         7: ([5, 4, 3, 2, 1], [0.05, 0.1, 0.2, 0.4, 0.25]),
     }
 
-    # --- Seasonal activity multipliers ---
-    def get_seasonal_multiplier(date, branch_id):
-        """Simulate branch-specific seasonality."""
-        month = date.month
-        base_multiplier = {
-            1: 1.3, 2: 1.3, 3: 1.2,
-            4: 0.9, 5: 1.1, 6: 1.2,
-            7: 0.7, 8: 0.7, 9: 1.1,
-            10: 1.0, 11: 0.8, 12: 0.8
-        }.get(month, 1.0)
-
-        # Add branch-specific noise
-        noise = random.uniform(0.90, 1.08)
-        if branch_id in [4, 5]:  
-            noise *= 1.08
-        elif branch_id in [6, 7]:  
-            noise *= 0.90
-
-        return base_multiplier * noise
-
-    # --- Weekday activity multipliers ---
-    def get_weekday_multiplier(date, branch_id):
-        """Simulate day-of-week differences per branch."""
-        weekday = date.weekday()  # 0 = Monday, 6 = Sunday
-        base_multipliers = {
-            0: 1.2,  # Monday
-            1: 1.1,  # Tuesday
-            2: 1.1,  # Wednesday
-            3: 1.0,  # Thursday
-            4: 0.7,  # Friday
-            5: 0.9,  # Saturday
-            6: 1.0   # Sunday
-        }
-        multiplier = base_multipliers.get(weekday, 1.0)
-
-        # Branch differences
-        if branch_id in [3, 7]:  
-            if weekday in [5, 6]:
-                multiplier *= 1.1
-        elif branch_id == 1:  
-            if weekday == 4:
-                multiplier *= 1.2
-
-        return multiplier
-
-    # --- Time of day slot selection ---
-    def generate_peak_check_in_time(visit_date, branch_id):
-        """Simulate peak/off-peak time selection with branch variation."""
-        base_slots = [
-            {"start": 6, "end": 8, "weight": 10},    # Morning
-            {"start": 9, "end": 11, "weight": 8},    # Mid morning
-            {"start": 11, "end": 13, "weight": 12},  # Lunch time
-            {"start": 14, "end": 17, "weight": 15},  # Afternoon
-            {"start": 18, "end": 21, "weight": 40},  # Evening
-            {"start": 21, "end": 23, "weight": 10},  # Late evening
-            {"start": 0, "end": 5, "weight": 5}      # Night owls
-        ]
-
-        # Branch-specific tweaks
-        if branch_id in [1, 4]:
-            base_slots[4]["weight"] += 5  # Evening even more busy
-        elif branch_id == 7:
-            base_slots[5]["weight"] += 5  # Late evening activity
+    # --- Precompiled behaviour model per branch ---
+    behaviour_models = {}
 
-        weights = [slot["weight"] for slot in base_slots]
-        chosen_slot = random.choices(base_slots, weights=weights, k=1)[0]
-
-        hour = random.randint(chosen_slot["start"], chosen_slot["end"])
-        minute = random.choice([0, 15, 30, 45])
-        second = random.randint(0, 59)
-
-        check_in_time = datetime.combine(visit_date, datetime.min.time()) + timedelta(hours=hour, minutes=minute, seconds=second)
-        return check_in_time
+    def get_behaviour_model(branch_id):
+        if branch_id not in behaviour_models:
+            profile = (behaviour_profiles or {}).get(branch_id)
+            behaviour_models[branch_id] = BranchBehaviourModel.for_branch(branch_id, profile)
+        return behaviour_models[branch_id]
 
     # --- Group payments by member ---
     payments_by_member = payments_df.groupby("member_id")
@@ -315,6 +648,7 @@ def generate_check_ins_by_payments(payments_df):
             end_date = payment["end_date"]
             duration_days = payment["duration_days"]
             branch_id = payment["branch_id"]
+            behaviour_model = get_behaviour_model(branch_id)
 
             # Base visits per duration period
             if duration_days <= 30:
@@ -325,92 +659,280 @@ def generate_check_ins_by_payments(payments_df):
                 base_visits = 150
 
             # Seasonal + random variation for visit count
-            seasonal_multiplier = get_seasonal_multiplier(start_date, branch_id)
-            raw_visits = int(np.random.normal(loc=base_visits, scale=base_visits * 0.4))
+            seasonal_multiplier = behaviour_model.seasonal_multiplier(start_date, rng)
+            raw_visits = int(np_rng.normal(loc=base_visits, scale=base_visits * 0.4))
             num_visits = int(max(1, raw_visits * seasonal_multiplier))
 
-            # Generate candidate visit dates
-            candidate_dates = [
-                fake.date_between_dates(date_start=start_date, date_end=min(end_date, END_DATE))
-                for _ in range(num_visits * 2)  # Oversample, then filter later
-            ]
-
-            # Weight dates by weekday activity
-            date_weights = [get_weekday_multiplier(d, branch_id) for d in candidate_dates]
-
-            # Sample final visit dates with weights
-            visit_dates = random.choices(candidate_dates, weights=date_weights, k=num_visits)
-            visit_dates.sort()
-
-            # Track visits per day
-            visits_by_date = {}
-            for date in visit_dates:
-                visits_by_date.setdefault(date, 0)
-                visits_by_date[date] += 1
-
-            # For each visit date
-            for visit_date, visit_count in visits_by_date.items():
-                prob = random.random()
-                if prob < 0.98:
-                    max_visits_today = random.randint(1, 2)
-                else:
-                    max_visits_today = random.randint(3, 5)
+            if batched:
+                # Oversample, weight and count visit days with a few array operations
+                days, visit_counts = draw_visit_days(start_date, min(end_date, END_DATE), num_visits, behaviour_model, np_rng)
+                max_visits_today = np.where(
+                    np_rng.random(len(days)) < 0.98,
+                    np_rng.randint(1, 3, size=len(days)),
+                    np_rng.randint(3, 6, size=len(days))
+                )
+                visit_days = np.repeat(days, np.minimum(visit_counts, max_visits_today))
+            else:
+                # Generate candidate visit dates
+                candidate_dates = [
+                    faker.date_between_dates(date_start=start_date, date_end=min(end_date, END_DATE))
+                    for _ in range(num_visits * 2)  # Oversample, then filter later
+                ]
+
+                # Weight dates by weekday activity
+                date_weights = [behaviour_model.weekday_multiplier(d) for d in candidate_dates]
+
+                # Sample final visit dates with weights
+                visit_dates = rng.choices(candidate_dates, weights=date_weights, k=num_visits)
+                visit_dates.sort()
+
+                # Track visits per day
+                visits_by_date = {}
+                for date in visit_dates:
+                    visits_by_date.setdefault(date, 0)
+                    visits_by_date[date] += 1
+
+                # Cap the visits on each date
+                visit_days = []
+                for visit_date, visit_count in visits_by_date.items():
+                    prob = rng.random()
+                    if prob < 0.98:
+                        max_visits_today = rng.randint(1, 2)
+                    else:
+                        max_visits_today = rng.randint(3, 5)
 
-                actual_visits_today = min(visit_count, max_visits_today)
+                    actual_visits_today = min(visit_count, max_visits_today)
+                    visit_days.extend([visit_date] * actual_visits_today)
 
-                last_checkout_time = None
-                for _ in range(actual_visits_today):
-                    check_in_time = generate_peak_check_in_time(visit_date, branch_id)
+            # Draw every check-in time of this payment at once
+            check_in_times = pd.to_datetime(behaviour_model.sample_check_in_times(visit_days, np_rng))
 
-                    # Workout duration logic
-                    prob_duration = random.random()
-                    if prob_duration < 0.9:
-                        workout_duration_second = random.randint(1800, 9000)
-                    elif prob_duration < 0.95:
-                        workout_duration_second = random.randint(1, 1800)
-                    else:
-                        workout_duration_second = random.randint(9000, 18000)
+            for check_in_time in check_in_times:
+                # Workout duration logic
+                prob_duration = rng.random()
+                if prob_duration < 0.9:
+                    workout_duration_second = rng.randint(1800, 9000)
+                elif prob_duration < 0.95:
+                    workout_duration_second = rng.randint(1, 1800)
+                else:
+                    workout_duration_second = rng.randint(9000, 18000)
 
-                    check_out_time = check_in_time + timedelta(seconds=workout_duration_second)
-                    if check_out_time > END_DATE:
-                        check_out_time = END_DATE
+                check_out_time = check_in_time + timedelta(seconds=workout_duration_second)
+                if check_out_time > END_DATE:
+                    check_out_time = END_DATE
 
-                    # Rating logic
-                    null_probability = branch_null_probability.get(branch_id, 0.55)
-                    if random.random() < null_probability:
-                        overall_rating = None
-                    else:
-                        ratings, weights = branch_rating_distribution.get(
-                            branch_id,
-                            ([5, 4, 3, 2, 1], [0.3, 0.4, 0.2, 0.08, 0.02])
-                        )
-                        overall_rating = random.choices(ratings, weights=weights, k=1)[0]
+                # Rating logic
+                null_probability = branch_null_probability.get(branch_id, 0.55)
+                if rng.random() < null_probability:
+                    overall_rating = None
+                else:
+                    ratings, weights = branch_rating_distribution.get(
+                        branch_id,
+                        ([5, 4, 3, 2, 1], [0.3, 0.4, 0.2, 0.08, 0.02])
+                    )
+                    overall_rating = rng.choices(ratings, weights=weights, k=1)[0]
+
+                # Append record
+                check_ins["check_in_id"].append(check_in_id)
+                check_ins["member_id"].append(member_id)
+                check_ins["check_in_time"].append(check_in_time)
+                check_ins["check_out_time"].append(check_out_time)
+                check_ins["overall_rating"].append(overall_rating)
+                check_ins["branch_id"].append(branch_id)
+
+                check_in_id += 1
+
+        # Flush a chunk once enough whole members have been buffered
+        if len(check_ins["check_in_id"]) >= chunk_size:
+            yield pd.DataFrame(check_ins, columns=CHECK_IN_COLUMNS)
+            check_ins = {column: [] for column in CHECK_IN_COLUMNS}
+
+    if check_ins["check_in_id"]:
+        yield pd.DataFrame(check_ins, columns=CHECK_IN_COLUMNS)
+
+def generate_check_ins_by_payments(payments_df, behaviour_profiles=None, batched=False):
+    """
+    Generate non-overlapping check-ins for each payment record, linked to the member and branch.
+    Adds seasonality, weekday variations, and time slot peak patterns, with branch-specific differences.
+    """
+    chunks = list(iter_check_ins_by_payments(payments_df, behaviour_profiles=behaviour_profiles, batched=batched))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
 
-                    # Append record
-                    check_ins.append({
-                        "check_in_id": check_in_id,
-                        "member_id": member_id,
-                        "check_in_time": check_in_time,
-                        "check_out_time": check_out_time,
-                        "overall_rating": overall_rating,
-                        "branch_id": branch_id
-                    })
+def generate_check_in_shard(task):
+    """
+    Worker for the parallel check-in generator: generate this shard's check-ins in
+    one frame from random sources of its own, seeded from the shard seed, so the
+    caller's global random state is left alone when shards run in-process.
+    """
+    shard_payments, shard_seed, branch_null_probability, behaviour_profiles, batched = task
+    shard_fake = Faker()
+    shard_fake.seed_instance(shard_seed)
+
+    chunks = list(iter_check_ins_by_payments(
+        shard_payments,
+        chunk_size=math.inf,  # one frame per shard
+        branch_null_probability=branch_null_probability,
+        behaviour_profiles=behaviour_profiles,
+        batched=batched,
+        rng=random.Random(shard_seed),
+        np_rng=np.random.RandomState(shard_seed),
+        faker=shard_fake
+    ))
+    if not chunks:
+        return pd.DataFrame(columns=CHECK_IN_COLUMNS)
+    return pd.concat(chunks, ignore_index=True)
+
+def map_in_window(executor, fn, tasks, window):
+    """
+    Like executor.map, but with at most `window` tasks submitted and unconsumed
+    at a time, so finished results never pile up ahead of a slow consumer.
+    Results are yielded in task order.
+    """
+    tasks = iter(tasks)
+    pending = deque(executor.submit(fn, task) for _, task in zip(range(window), tasks))
+    while pending:
+        result = pending.popleft().result()
+        for task in tasks:
+            pending.append(executor.submit(fn, task))
+            break
+        yield result
+
+def iter_check_ins_parallel(payments_df, seed, workers=None, num_shards=256, behaviour_profiles=None, batched=False):
+    """
+    Generate check-ins on a process pool, yielding one frame per shard in member order.
 
-                    check_in_id += 1
+    Members are split into num_shards contiguous blocks of member_id and shard i
+    is seeded from (seed, i), so the output only depends on seed and num_shards,
+    never on the number of workers. check_in_id is renumbered contiguously across
+    shards, which makes the frames safe to pass to write_check_in_chunks.
 
-    check_ins_df = pd.DataFrame(check_ins)
-    return check_ins_df
+    Only about `workers` shards are in flight at once, so memory stays bounded by
+    roughly (workers + 1) / num_shards of the check-in table; raise num_shards
+    for larger worker counts.
+    """
+    member_ids = np.sort(payments_df['member_id'].unique())
+    shard_bounds = [block[0] for block in np.array_split(member_ids, num_shards) if len(block)]
+    shard_of_payment = np.searchsorted(shard_bounds, payments_df['member_id'].to_numpy(), side='right') - 1
+
+    branch_null_probability = draw_branch_null_probabilities(random.Random(seed))
+    tasks = [
+        (
+            payments_df[shard_of_payment == shard_id],
+            int(np.random.SeedSequence([seed, shard_id]).generate_state(1)[0]),
+            branch_null_probability,
+            behaviour_profiles,
+            batched
+        )
+        for shard_id in range(len(shard_bounds))
+    ]
+
+    if workers == 1:
+        shard_frames = map(generate_check_in_shard, tasks)
+        executor = None
+    else:
+        workers = workers or os.cpu_count() or 1
+        executor = ProcessPoolExecutor(max_workers=workers)
+        shard_frames = map_in_window(executor, generate_check_in_shard, tasks, window=workers)
+
+    try:
+        next_check_in_id = 1
+        for shard_df in shard_frames:
+            shard_df['check_in_id'] = np.arange(next_check_in_id, next_check_in_id + len(shard_df))
+            next_check_in_id += len(shard_df)
+            yield shard_df
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+def generate_check_ins_parallel(payments_df, seed, workers=None, num_shards=256, behaviour_profiles=None, batched=False):
+    """
+    Generate check-ins with a process pool; identical output for a given seed at any worker count.
+    """
+    shard_frames = list(iter_check_ins_parallel(payments_df, seed, workers, num_shards, behaviour_profiles, batched))
+    if not shard_frames:
+        return pd.DataFrame(columns=CHECK_IN_COLUMNS)
+    return pd.concat(shard_frames, ignore_index=True)
+
+def write_check_in_chunks(chunks, path, table_name="check_ins"):
+    """
+    Write check-in chunks straight to disk as they are generated.
+
+    The format follows the file extension: .csv appends to one CSV, .parquet
+    writes one row group per chunk (needs pyarrow) and .db/.sqlite appends to
+    table_name in a SQLite database. Returns the number of rows written.
+    """
+    rows_written = 0
+
+    if path.endswith(".csv"):
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+            rows_written += len(chunk)
+
+    elif path.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in chunks:
+                # Ratings are nullable, keep them as floats so every row group shares one schema
+                table = pa.Table.from_pandas(chunk.astype({"overall_rating": "float64"}), preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                rows_written += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    elif path.endswith((".db", ".sqlite")):
+        import sqlite3
+
+        conn = sqlite3.connect(path)
+        try:
+            for chunk in chunks:
+                chunk.to_sql(table_name, conn, if_exists="append", index=False)
+                conn.commit()
+                rows_written += len(chunk)
+        finally:
+            conn.close()
+
+    else:
+        raise ValueError(f"Unsupported check-in output format: {path}")
+
+    return rows_written
 
 
 if __name__ == "__main__":
+    # python 1_member_payment_checkins.py [--batched] [--workers N] [--seed S]
+    batched = "--batched" in sys.argv
+    seed = int(sys.argv[sys.argv.index("--seed") + 1]) if "--seed" in sys.argv else None
+    if seed is None and "--workers" in sys.argv:
+        # Parallel shards need a master seed: draw one, and print it so the run can be reproduced
+        seed = int(np.random.SeedSequence().generate_state(1)[0])
+        print(f"No --seed given, using --seed {seed}")
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+        fake.seed_instance(seed)
+
     branches_df = pd.read_csv('Branch.csv')
     memberships_df = pd.read_csv('Membership_Type.csv')
 
-    members_df = generate_members_by_branch(branches_df)
+    members_df = generate_members_by_branch(branches_df, batched=batched)
 
-    payments_df = generate_payments_by_members(members_df, memberships_df)
+    payments_df = generate_payments_by_members(members_df, memberships_df, batched=batched)
 
-    check_ins_df = generate_check_ins_by_payments(payments_df)
+    # Check-ins are streamed to disk chunk by chunk instead of being held in memory
+    if "--workers" in sys.argv:
+        # Parallel mode: shards are seeded from S, so output is the same at any N
+        workers = int(sys.argv[sys.argv.index("--workers") + 1])
+        check_in_chunks = iter_check_ins_parallel(payments_df, seed, workers, batched=batched)
+    else:
+        check_in_chunks = iter_check_ins_by_payments(payments_df, batched=batched)
+    write_check_in_chunks(check_in_chunks, '0check_ins.csv')
 
     members_df["date_of_birth"] = pd.to_datetime(members_df["date_of_birth"]).dt.date
     members_df["join_date"] = pd.to_datetime(members_df["join_date"]).dt.date
@@ -418,8 +940,6 @@ if __name__ == "__main__":
     payments_df["start_date"]=pd.to_datetime(payments_df["start_date"]).dt.date
     payments_df["end_date"]=pd.to_datetime(payments_df["end_date"]).dt.date
 
-members_df.to_csv('0members.csv', index=False)
-
-payments_df.to_csv('0payments.csv', index=False)
+    members_df.to_csv('0members.csv', index=False)
 
-check_ins_df.to_csv('0check_ins.csv', index=False)
+    payments_df.to_csv('0payments.csv', index=False)
@@ -7,20 +7,361 @@ Created on Sat Mar 15 20:12:26 2025
 """
 
 import pandas as pd
+import sys
 import random
+import bisect
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from faker import Faker
+from simulation_config import START_DATE, END_DATE
 
 fake = Faker()
 
-branches_df = pd.read_csv('Branch.csv')
-trainers_df = pd.read_csv('0trainers.csv')
-classes_df = pd.read_csv('0Class.csv')
+# Time slots: Morning (7-10AM), Evening (6-8PM)
+TIME_SLOTS = [(7, 10), (18, 20)]
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
 
-START_DATE = datetime(2022, 1, 1)
-END_DATE = datetime(2024, 12, 31)
+def get_weekly_session_count(trainer_count, rng=random):
+    """Weekly session count based on trainer count."""
+    if trainer_count == 2:
+        return rng.randint(10, 14)
+    elif 3 <= trainer_count:
+        return rng.randint(20, 25)
+    else:
+        return rng.randint(25, 30)
 
-def generate_class_sessions(branches_df, trainers_df, classes_df):
+def schedule_branch_rejection(branch_id, branch_trainers, classes_df, rng=random, np_rng=np.random):
+    """
+    Schedule one branch by rejection sampling: up to 50 random (trainer, class, time)
+    attempts per day, rejecting any that break the 30-minute gap between sessions.
+    rng and np_rng are the random sources (random and np.random by default), as for
+    every scheduler in BRANCH_SCHEDULERS.
+    """
+    sessions = []
+    weekly_sessions = get_weekly_session_count(len(branch_trainers), rng)
+    # DataFrame.sample takes a RandomState, or None for the global one
+    random_state = None if np_rng is np.random else np_rng
+
+    current_date = START_DATE
+    while current_date <= END_DATE:
+        daily_sessions = []
+        trainers_scheduled_today = set()
+
+        # Randomly decide how many sessions on this day (minimum 0, max depends on branch)
+        sessions_today_count = rng.randint(1, min(3, weekly_sessions // 7))
+
+        attempts = 0
+        while len(daily_sessions) < sessions_today_count and attempts < 50:
+            attempts += 1
+
+            # Pick a trainer not already scheduled today
+            available_trainers = branch_trainers[
+                ~branch_trainers['trainer_id'].isin(trainers_scheduled_today)
+            ]
+
+            if available_trainers.empty:
+                break  # No trainer available
+
+            trainer = available_trainers.sample(1, random_state=random_state).iloc[0]
+            trainer_id = trainer['trainer_id']
+
+            # Pick a class
+            class_row = classes_df.sample(1, random_state=random_state).iloc[0]
+            class_id = class_row['class_id']
+            class_duration_minutes = int(class_row['duration'])
+            
+            # Pick session time
+            slot = rng.choice(TIME_SLOTS)
+            hour = rng.randint(slot[0], slot[1] - 1)
+            minute = rng.choice([0, 30])
+            
+            session_start = datetime.combine(current_date, datetime.min.time()) + timedelta(hours=hour, minutes=minute)
+            session_end = session_start + timedelta(minutes=class_duration_minutes)
+            
+            # Enforce: branch session gap >= 30 min
+            conflict = False
+            for existing in daily_sessions:
+                existing_start = existing['start_time']
+                existing_end = existing['end_time']
+            
+                # Gap between sessions >= 30 mins
+                if not (
+                    session_start >= existing_end + timedelta(minutes=30) or
+                    session_end <= existing_start - timedelta(minutes=30)
+                ):
+                    conflict = True
+                    break
+            
+            if conflict:
+                continue  # Try another time
+            
+            # Everything is OK, schedule the session
+            trainers_scheduled_today.add(trainer_id)
+            
+            sessions.append({
+                'class_id': class_id,
+                'trainer_id': trainer_id,
+                'start_time': session_start,
+                'end_time': session_end,
+                'capacity': rng.choice([10, 15, 20]),
+                'status': 'Completed' if rng.random() < 0.9 else 'Cancelled',
+                'session_date': current_date.date(),
+                'branch_id': branch_id
+            })
+            
+            daily_sessions.append({
+                'start_time': session_start,
+                'end_time': session_end
+            })
+
+        # Move to the next day
+        current_date += timedelta(days=1)
+
+    return sessions
+
+def build_slot_masks(classes_df):
+    """
+    Precompute the slot bitmaps used by the bitmap scheduler.
+
+    Returns the candidate start slots, their sampling weights (each time window
+    equally likely, then uniform over its half-hour starts, as in the rejection
+    scheduler) and an array of bitmasks [class, start] of the 30-minute slots a
+    class starting there occupies.
+    """
+    start_slots = []
+    start_weights = []
+    for first_hour, end_hour in TIME_SLOTS:
+        window_starts = [hour * 60 // SLOT_MINUTES + half for hour in range(first_hour, end_hour) for half in (0, 1)]
+        start_slots.extend(window_starts)
+        start_weights.extend([1.0 / len(TIME_SLOTS) / len(window_starts)] * len(window_starts))
+    start_slots = np.array(start_slots, dtype=np.uint64)
+
+    slot_counts = np.ceil(classes_df['duration'].to_numpy(dtype=float) / SLOT_MINUTES).astype(np.uint64)
+    occupied = (np.uint64(1) << slot_counts) - np.uint64(1)
+    session_masks = occupied[:, None] << start_slots[None, :]
+    return start_slots, np.array(start_weights), session_masks
+
+def build_pair_weights(start_weights, session_masks):
+    """Sampling weight of every (class, start) pair, flattened like session_masks; classes are equally likely."""
+    return np.broadcast_to(start_weights, session_masks.shape).ravel() / session_masks.shape[0]
+
+def feasible_pair_weights(pair_weights, session_masks, day_bitmap):
+    """
+    pair_weights with every (class, start) pair that does not fit the day zeroed.
+    A session may not touch a taken slot or its neighbours (the 30-minute gap).
+    """
+    # Slots already taken plus the 30-minute gap on either side
+    blocked = np.uint64(day_bitmap | (day_bitmap << 1) | (day_bitmap >> 1))
+    return pair_weights * ((session_masks & blocked) == 0).ravel()
+
+def schedule_branch_bitmap(branch_id, branch_trainers, classes_df, slot_masks=None, rng=random, np_rng=np.random):
+    """
+    Schedule one branch with slot bitmaps instead of rejection sampling.
+
+    Each day is a bitmap of 30-minute slots already taken and trainer
+    availability is a second bitmap over the branch's trainers. A session may
+    not touch a taken slot or its neighbours (the 30-minute gap), so feasible
+    (class, start) pairs are found with one vectorised AND and sampled directly:
+    every attempt succeeds and a day costs a fixed number of array operations.
+    """
+    sessions = []
+    weekly_sessions = get_weekly_session_count(len(branch_trainers), rng)
+
+    start_slots, start_weights, session_masks = slot_masks or build_slot_masks(classes_df)
+    class_ids = classes_df['class_id'].to_numpy()
+    class_durations = classes_df['duration'].to_numpy(dtype=np.int64)
+    trainer_ids = branch_trainers['trainer_id'].to_numpy()
+    pair_weights = build_pair_weights(start_weights, session_masks)
+    all_trainers = (1 << len(trainer_ids)) - 1
+
+    current_date = START_DATE
+    while current_date <= END_DATE:
+        day_bitmap = 0
+        available_trainers = all_trainers
+
+        # Randomly decide how many sessions on this day (minimum 0, max depends on branch)
+        sessions_today_count = rng.randint(1, min(3, weekly_sessions // 7))
+
+        for _ in range(sessions_today_count):
+            if available_trainers == 0:
+                break  # No trainer available
+
+            weights = feasible_pair_weights(pair_weights, session_masks, day_bitmap)
+            if not weights.any():
+                break  # Day is full
+
+            pair = np_rng.choice(len(weights), p=weights / weights.sum())
+            class_index, start_index = divmod(pair, len(start_slots))
+
+            free_trainers = [i for i in range(len(trainer_ids)) if available_trainers >> i & 1]
+            trainer_index = rng.choice(free_trainers)
+
+            day_bitmap |= int(session_masks[class_index, start_index])
+            available_trainers &= ~(1 << trainer_index)
+
+            session_start = datetime.combine(current_date, datetime.min.time()) + timedelta(
+                minutes=int(start_slots[start_index]) * SLOT_MINUTES
+            )
+            sessions.append({
+                'class_id': class_ids[class_index],
+                'trainer_id': trainer_ids[trainer_index],
+                'start_time': session_start,
+                'end_time': session_start + timedelta(minutes=int(class_durations[class_index])),
+                'capacity': rng.choice([10, 15, 20]),
+                'status': 'Completed' if rng.random() < 0.9 else 'Cancelled',
+                'session_date': current_date.date(),
+                'branch_id': branch_id
+            })
+
+        # Move to the next day
+        current_date += timedelta(days=1)
+
+    return sessions
+
+# --- Documented business rules enforced by the weekly scheduler ---
+TRAINER_GAP_MINUTES = 60         # no overlapping or back-to-back trainer sessions within 1 hour
+SINGLE_TRAINER_MAX_PER_DAY = 2
+MAX_SESSIONS_PER_DAY = 5         # assumed cap, not a documented rule (see schedule_branch_weekly)
+MIN_SESSIONS_PER_WEEK = 5
+
+def get_documented_weekly_session_count(trainer_count, rng=random):
+    """Weekly session count from the documented rules."""
+    if trainer_count == 1:
+        return rng.randint(8, 10)
+    elif trainer_count <= 3:
+        return rng.randint(18, 20)
+    else:
+        return rng.randint(25, 30)
+
+class TrainerIntervals:
+    """
+    Sorted, non-overlapping session intervals (minutes since week start) per trainer,
+    checked with bisect against the TRAINER_GAP_MINUTES buffer.
+    """
+
+    def __init__(self, trainer_count):
+        self.starts = [[] for _ in range(trainer_count)]
+        self.ends = [[] for _ in range(trainer_count)]
+
+    def is_free(self, trainer_index, start, end):
+        starts, ends = self.starts[trainer_index], self.ends[trainer_index]
+        # Only the last session starting before end + gap can come within the gap
+        i = bisect.bisect_left(starts, end + TRAINER_GAP_MINUTES)
+        return i == 0 or ends[i - 1] + TRAINER_GAP_MINUTES <= start
+
+    def add(self, trainer_index, start, end):
+        i = bisect.bisect_left(self.starts[trainer_index], start)
+        self.starts[trainer_index].insert(i, start)
+        self.ends[trainer_index].insert(i, end)
+
+def schedule_branch_weekly(branch_id, branch_trainers, classes_df, slot_masks=None, rng=random, np_rng=np.random):
+    """
+    Schedule one branch a week at a time, enforcing every documented rule:
+    weekly counts by number of active trainers (at least MIN_SESSIONS_PER_WEEK),
+    sessions only on or after the trainer's join_date, at most
+    SINGLE_TRAINER_MAX_PER_DAY sessions a day with one trainer (MAX_SESSIONS_PER_DAY
+    otherwise), a 30-minute gap between the branch's sessions, no trainer sessions
+    within TRAINER_GAP_MINUTES of each other, and an 85%-98% completion rate per branch.
+
+    MAX_SESSIONS_PER_DAY is an assumption rather than a documented rule: it keeps
+    multi-trainer branches from piling a week's sessions onto a few days, and with
+    the 30-minute gap the TIME_SLOTS windows rarely fit more anyway.
+
+    Trainers are held as arrays (join dates) plus per-trainer sorted interval
+    lists, and branch days as slot bitmaps, so no DataFrame is filtered while
+    placing sessions.
+    """
+    sessions = []
+    completion_rate = rng.uniform(0.85, 0.98)
+
+    start_slots, start_weights, session_masks = slot_masks or build_slot_masks(classes_df)
+    class_ids = classes_df['class_id'].to_numpy()
+    class_durations = classes_df['duration'].to_numpy(dtype=np.int64)
+    pair_weights = build_pair_weights(start_weights, session_masks)
+
+    trainer_ids = branch_trainers['trainer_id'].to_numpy()
+    join_dates = pd.to_datetime(branch_trainers['join_date']).dt.normalize().to_numpy()
+
+    week_start = START_DATE
+    while week_start <= END_DATE:
+        week_days = [week_start + timedelta(days=i) for i in range(7) if week_start + timedelta(days=i) <= END_DATE]
+        week_start += timedelta(days=7)
+
+        # Join-date mask per day: trainers who have started by that day
+        active = [join_dates <= np.datetime64(day) for day in week_days]
+        active_count = max(int(mask.sum()) for mask in active)
+        if active_count == 0:
+            continue
+
+        weekly_sessions = max(MIN_SESSIONS_PER_WEEK, get_documented_weekly_session_count(active_count, rng))
+        weekly_sessions = round(weekly_sessions * len(week_days) / 7)  # partial final week
+        max_per_day = SINGLE_TRAINER_MAX_PER_DAY if active_count == 1 else MAX_SESSIONS_PER_DAY
+
+        day_bitmaps = [0] * len(week_days)
+        day_counts = [0] * len(week_days)
+        open_days = [i for i in range(len(week_days)) if active[i].any()]
+        trainer_intervals = TrainerIntervals(len(trainer_ids))
+        week_sessions = []
+
+        while len(week_sessions) < weekly_sessions and open_days:
+            day_index = rng.choice(open_days)
+            day_bitmap = day_bitmaps[day_index]
+            day_offset = day_index * 24 * 60
+            weights = feasible_pair_weights(pair_weights, session_masks, day_bitmap)
+
+            placed = False
+            while weights.any():
+                pair = np_rng.choice(len(weights), p=weights / weights.sum())
+                class_index, start_index = divmod(pair, len(start_slots))
+                start = day_offset + int(start_slots[start_index]) * SLOT_MINUTES
+                end = start + int(class_durations[class_index])
+
+                # First free trainer in random order is a uniform pick among free trainers
+                for trainer_index in np_rng.permutation(np.flatnonzero(active[day_index])):
+                    if trainer_intervals.is_free(trainer_index, start, end):
+                        placed = True
+                        break
+                if placed:
+                    break
+                weights[pair] = 0  # No trainer can take this class at this time
+
+            if not placed:
+                open_days.remove(day_index)
+                continue
+
+            trainer_intervals.add(trainer_index, start, end)
+            day_bitmaps[day_index] |= int(session_masks[class_index, start_index])
+            day_counts[day_index] += 1
+            if day_counts[day_index] >= max_per_day:
+                open_days.remove(day_index)
+
+            session_start = datetime.combine(week_days[day_index], datetime.min.time()) + timedelta(
+                minutes=int(start_slots[start_index]) * SLOT_MINUTES
+            )
+            week_sessions.append({
+                'class_id': class_ids[class_index],
+                'trainer_id': trainer_ids[trainer_index],
+                'start_time': session_start,
+                'end_time': session_start + timedelta(minutes=int(class_durations[class_index])),
+                'capacity': rng.choice([10, 15, 20]),
+                'status': 'Completed' if rng.random() < completion_rate else 'Cancelled',
+                'session_date': week_days[day_index].date(),
+                'branch_id': branch_id
+            })
+
+        sessions.extend(sorted(week_sessions, key=lambda session: session['start_time']))
+
+    return sessions
+
+BRANCH_SCHEDULERS = {
+    'rejection': schedule_branch_rejection,
+    'bitmap': schedule_branch_bitmap,
+    'weekly': schedule_branch_weekly,
+}
+
+def generate_class_sessions(branches_df, trainers_df, classes_df, scheduler='rejection'):
     """
     Generate class session data for branches based on trainers and classes.
 
@@ -34,7 +375,12 @@ def generate_class_sessions(branches_df, trainers_df, classes_df):
         - Session capacity is randomly 10, 15, or 20
         - Each branch has 85%-98% of sessions marked as 'Completed', rest as 'Cancelled'
         - A trainer cannot have overlapping sessions or back-to-back sessions within 1 hour
+
+    scheduler: 'rejection' (random attempts per day, enforces one session per trainer per day
+    and the branch gap only), 'bitmap' (same rules, feasible slots sampled directly) or
+    'weekly' (every rule above, see schedule_branch_weekly).
     """
+    schedule_branch = BRANCH_SCHEDULERS[scheduler]
     sessions = []
     session_id = 1
 
@@ -47,97 +393,74 @@ def generate_class_sessions(branches_df, trainers_df, classes_df):
             print(f"Branch {branch_id} has no trainers. Skipping.")
             continue
 
-        # Weekly session count based on trainer count
-        if trainer_count == 2:
-            weekly_sessions = random.randint(10, 14)
-        elif 3 <= trainer_count:
-            weekly_sessions = random.randint(20, 25)
-        else:
-            weekly_sessions = random.randint(25, 30)
-
-        # Time slots: Morning (7-10AM), Evening (6-8PM)
-        time_slots = [(7, 10), (18, 20)]
-
-        current_date = START_DATE
-        while current_date <= END_DATE:
-            daily_sessions = []
-            trainers_scheduled_today = set()
-
-            # Randomly decide how many sessions on this day (minimum 0, max depends on branch)
-            sessions_today_count = random.randint(1, min(3, weekly_sessions // 7))
-
-            attempts = 0
-            while len(daily_sessions) < sessions_today_count and attempts < 50:
-                attempts += 1
-
-                # Pick a trainer not already scheduled today
-                available_trainers = branch_trainers[
-                    ~branch_trainers['trainer_id'].isin(trainers_scheduled_today)
-                ]
-
-                if available_trainers.empty:
-                    break  # No trainer available
-
-                trainer = available_trainers.sample(1).iloc[0]
-                trainer_id = trainer['trainer_id']
-
-                # Pick a class
-                class_row = classes_df.sample(1).iloc[0]
-                class_id = class_row['class_id']
-                class_duration_minutes = int(class_row['duration'])
-                
-                # Pick session time
-                slot = random.choice(time_slots)
-                hour = random.randint(slot[0], slot[1] - 1)
-                minute = random.choice([0, 30])
-                
-                session_start = datetime.combine(current_date, datetime.min.time()) + timedelta(hours=hour, minutes=minute)
-                session_end = session_start + timedelta(minutes=class_duration_minutes)
-                
-                # Enforce: branch session gap >= 30 min
-                conflict = False
-                for existing in daily_sessions:
-                    existing_start = existing['start_time']
-                    existing_end = existing['end_time']
-                
-                    # Gap between sessions >= 30 mins
-                    if not (
-                        session_start >= existing_end + timedelta(minutes=30) or
-                        session_end <= existing_start - timedelta(minutes=30)
-                    ):
-                        conflict = True
-                        break
-                
-                if conflict:
-                    continue  # Try another time
-                
-                # Everything is OK, schedule the session
-                trainers_scheduled_today.add(trainer_id)
-                
-                sessions.append({
-                    'session_id': session_id,
-                    'class_id': class_id,
-                    'trainer_id': trainer_id,
-                    'start_time': session_start,
-                    'end_time': session_end,
-                    'capacity': random.choice([10, 15, 20]),
-                    'status': 'Completed' if random.random() < 0.9 else 'Cancelled',
-                    'session_date': current_date.date(),
-                    'branch_id': branch_id
-                })
-                
-                daily_sessions.append({
-                    'start_time': session_start,
-                    'end_time': session_end
-                })
-                
-                session_id += 1
-
-            # Move to the next day
-            current_date += timedelta(days=1)
+        for session in schedule_branch(branch_id, branch_trainers, classes_df):
+            sessions.append({'session_id': session_id, **session})
+            session_id += 1
+
+    sessions_df = pd.DataFrame(sessions)
+    return sessions_df
+
+def generate_branch_sessions(task):
+    """
+    Worker for generate_class_sessions_parallel: schedule this branch with random
+    sources of its own, seeded from the branch seed, so the caller's global random
+    state is left alone when branches run in-process.
+    """
+    branch_id, branch_trainers, classes_df, scheduler, branch_seed = task
+    return BRANCH_SCHEDULERS[scheduler](
+        branch_id, branch_trainers, classes_df,
+        rng=random.Random(branch_seed),
+        np_rng=np.random.RandomState(branch_seed)
+    )
+
+def generate_class_sessions_parallel(branches_df, trainers_df, classes_df, seed, workers=None, scheduler='rejection'):
+    """
+    Generate class sessions with one branch per process.
+
+    Branches share nothing, so each is scheduled independently with a seed
+    derived from (seed, branch_id). After the merge, session_id is renumbered
+    in branch order, then by start_time, so the output is identical at any
+    worker count.
+    """
+    tasks = []
+    for branch_id in branches_df['branch_id']:
+        branch_trainers = trainers_df[trainers_df['branch_id'] == branch_id]
+        if len(branch_trainers) == 0:
+            print(f"Branch {branch_id} has no trainers. Skipping.")
+            continue
+        branch_seed = int(np.random.SeedSequence([seed, int(branch_id)]).generate_state(1)[0])
+        tasks.append((branch_id, branch_trainers, classes_df, scheduler, branch_seed))
+
+    if workers == 1:
+        results = list(map(generate_branch_sessions, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(generate_branch_sessions, tasks))
+
+    sessions = []
+    for branch_sessions in results:
+        sessions.extend(sorted(branch_sessions, key=lambda session: session['start_time']))
 
     sessions_df = pd.DataFrame(sessions)
+    sessions_df.insert(0, 'session_id', np.arange(1, len(sessions_df) + 1))
     return sessions_df
 
-class_sessions_df = generate_class_sessions(branches_df, trainers_df, classes_df)
-class_sessions_df.to_csv('0class_sessions_df.csv', index=False)
+
+if __name__ == "__main__":
+    branches_df = pd.read_csv('Branch.csv')
+    trainers_df = pd.read_csv('0trainers.csv')
+    classes_df = pd.read_csv('0Class.csv')
+
+    # python 2_sessions.py [--scheduler rejection|bitmap|weekly] [--workers N [--seed S]]
+    scheduler = sys.argv[sys.argv.index("--scheduler") + 1] if "--scheduler" in sys.argv else 'rejection'
+    if scheduler not in BRANCH_SCHEDULERS:
+        sys.exit(f"Unknown scheduler {scheduler!r}, choose from: {', '.join(BRANCH_SCHEDULERS)}")
+
+    if "--workers" in sys.argv:
+        # Parallel mode: one branch per process, output identical at any N
+        workers = int(sys.argv[sys.argv.index("--workers") + 1])
+        seed = int(sys.argv[sys.argv.index("--seed") + 1]) if "--seed" in sys.argv else 0
+        class_sessions_df = generate_class_sessions_parallel(branches_df, trainers_df, classes_df, seed, workers, scheduler)
+    else:
+        class_sessions_df = generate_class_sessions(branches_df, trainers_df, classes_df, scheduler)
+    class_sessions_df.to_csv('0class_sessions_df.csv', index=False)
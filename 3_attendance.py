@@ -9,17 +9,12 @@ Created on Sat Mar 15 20:20:57 2025
 import pandas as pd
 import numpy as np
 import random
+import bisect
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-# ------------------------------
-# 1. Load input data
-# ------------------------------
-sessions_df = pd.read_csv('0class_sessions_df.csv')
-members_df = pd.read_csv('0members.csv')
-checkins_df = pd.read_csv('0check_ins.csv')
-classes_df = pd.read_csv('0Class.csv')
-
-
 class_type_attendance = {
     "Cardio":     {"min_rate": 0.8, "max_rate": 0.98}, 
     "Strength":     {"min_rate": 0.6, "max_rate": 0.85},  
@@ -27,160 +22,311 @@ class_type_attendance = {
     "Stretching":  {"min_rate": 0.65, "max_rate": 0.9},
     "Default": {"min_rate": 0.7, "max_rate": 0.98}
 }
-# ------------------------------
-# 2. Filter 'Completed' sessions
-# ------------------------------
-completed_sessions = sessions_df[sessions_df['status'].str.lower() == 'completed'].copy()
 
 # ------------------------------
-# 3. Convert datetime columns
+# Check-in index by branch
 # ------------------------------
-completed_sessions['session_start_dt'] = pd.to_datetime(completed_sessions['start_time'])
-completed_sessions['session_end_dt'] = pd.to_datetime(completed_sessions['end_time'])
-checkins_df['check_in_time'] = pd.to_datetime(checkins_df['check_in_time'])
-checkins_df['check_out_time'] = pd.to_datetime(checkins_df['check_out_time'])
+class CheckInIntervalIndex:
+    """
+    Check-ins partitioned by branch and sorted by check_in_time.
+
+    A session is covered by a check-in when check_in_time <= session_start and
+    check_out_time >= session_end. No visit lasts longer than the branch's
+    longest visit, so only check-ins starting in
+    [session_end - longest_visit, session_start] can qualify. That window is
+    found with two binary searches, giving O(log n + k) per session.
+    """
+
+    def __init__(self, checkins):
+        branch_ids = checkins['branch_id'].to_numpy()
+        check_in = checkins['check_in_time'].to_numpy()
+        check_out = checkins['check_out_time'].to_numpy()
 
-# Add date columns
-completed_sessions['session_date'] = completed_sessions['session_start_dt'].dt.date
+        order = np.lexsort((check_in, branch_ids))
+        boundaries = np.flatnonzero(np.diff(branch_ids[order])) + 1
+
+        self.partitions = {}
+        for positions in np.split(order, boundaries):
+            if len(positions) == 0:
+                continue
+            self.partitions[branch_ids[positions[0]]] = (
+                check_in[positions],
+                check_out[positions],
+                positions,
+                (check_out[positions] - check_in[positions]).max()
+            )
+
+    def eligible_positions(self, branch_id, session_start, session_end):
+        """Row positions (in original order) of check-ins covering the session."""
+        partition = self.partitions.get(branch_id)
+        if partition is None:
+            return np.empty(0, dtype=np.int64)
+
+        check_in, check_out, positions, longest_visit = partition
+        session_start = np.datetime64(session_start)
+        session_end = np.datetime64(session_end)
+        lo = np.searchsorted(check_in, session_end - longest_visit, side='left')
+        hi = np.searchsorted(check_in, session_start, side='right')
+        covering = check_out[lo:hi] >= session_end
+        return np.sort(positions[lo:hi][covering])
 
 # ------------------------------
-# 4. Merge check-ins with members
+# Member availability per day
 # ------------------------------
-member_checkins = checkins_df.merge(
-    members_df[['member_id', 'branch_id']],
-    on='member_id',
-    suffixes=('', '_member')
-)
+MAX_SESSIONS_PER_DAY = 5
+
+class MemberAvailabilityTracker:
+    """
+    Per-day class bookings: an array of session counts indexed by member_id plus
+    sorted, non-overlapping busy intervals for each booked member.
+    A member can attend [start, end) while under MAX_SESSIONS_PER_DAY sessions
+    and not overlapping a booked interval, answered in O(log k).
+    """
+
+    def __init__(self, max_member_id):
+        self.counts = np.zeros(max_member_id + 1, dtype=np.int64)
+        self.busy = {}  # {member_id: ([starts], [ends])}, sorted by start
+
+    def reset(self):
+        """Start a new day."""
+        if self.busy:
+            self.counts[list(self.busy)] = 0
+        self.busy = {}
+
+    def can_attend(self, member_id, start, end):
+        if self.counts[member_id] >= MAX_SESSIONS_PER_DAY:
+            return False
+        intervals = self.busy.get(member_id)
+        if intervals is None:
+            return True
+        starts, ends = intervals
+        # Only the last interval starting before `end` can overlap [start, end)
+        i = bisect.bisect_left(starts, end)
+        return i == 0 or ends[i - 1] <= start
+
+    def available(self, member_ids, start, end):
+        """Members of member_ids (order kept) who can attend [start, end)."""
+        member_ids = np.asarray(member_ids)
+        under_limit = member_ids[self.counts[member_ids] < MAX_SESSIONS_PER_DAY]
+        return [
+            member_id for member_id in under_limit.tolist()
+            if member_id not in self.busy or self.can_attend(member_id, start, end)
+        ]
+
+    def book(self, member_ids, start, end):
+        for member_id in member_ids:
+            self.counts[member_id] += 1
+            starts, ends = self.busy.setdefault(member_id, ([], []))
+            i = bisect.bisect_left(starts, start)
+            starts.insert(i, start)
+            ends.insert(i, end)
 
 # ------------------------------
-# 5. Process sessions by date
+# Attendance allocation engine
 # ------------------------------
-attendees_list = []
+def build_class_rate_table(classes_df):
+    """
+    Resolve class_id -> class type -> attendance config once, as arrays of
+    min/max attendance rate indexed by class_id.
+    """
+    max_class_id = int(classes_df['class_id'].max()) if len(classes_df) else 0
+    default = class_type_attendance["Default"]
+    min_rates = np.full(max_class_id + 1, default["min_rate"])
+    max_rates = np.full(max_class_id + 1, default["max_rate"])
+    for class_id, class_type in zip(classes_df['class_id'], classes_df['type']):
+        config = class_type_attendance.get(class_type, default)
+        min_rates[class_id] = config["min_rate"]
+        max_rates[class_id] = config["max_rate"]
+    return min_rates, max_rates
 
-# Group sessions by date
-date_groups = completed_sessions.groupby('session_date')
+def allocate_attendance(completed_sessions, member_checkins, classes_df, seed=None):
+    """
+    Allocate members to completed sessions, one date at a time in start-time order.
 
-for date, date_sessions in date_groups:
-    # Sort sessions by start time
-    sorted_sessions = date_sessions.sort_values('session_start_dt')
-    
-    # Track member availability
-    member_status = {}  # {member_id: {'count': int, 'time_slots': [(start, end)]}}
-    
-    for _, session in sorted_sessions.iterrows():
-        branch_id = session['branch_id']
-        session_start = session['session_start_dt']
-        session_end = session['session_end_dt']
-        session_id = session['session_id']
-        capacity = session['capacity']
-        
-        # 1. Find eligible members with valid check-in times
-        eligible = member_checkins[
-            (member_checkins['branch_id'] == branch_id) &
-            (member_checkins['check_in_time'] <= session_start) &
-            (member_checkins['check_out_time'] >= session_end)
-        ].copy()
-        
-        if eligible.empty:
-            continue
-        
-        # 2. Filter members with available time slots
-        available_members = []
-        for member_id in eligible['member_id'].unique():
-            member_records = eligible[eligible['member_id'] == member_id]
-            
-            # Check daily limit
-            current_status = member_status.get(member_id, {'count': 0, 'time_slots': []})
-            if current_status['count'] >= 5:
+    completed_sessions needs session_id, class_id, branch_id, capacity,
+    session_date, session_start_dt and session_end_dt; member_checkins needs
+    member_id, branch_id, check_in_time and check_out_time. Returns one row per
+    attendee: the covering check-in plus session_id, class_id, session_start,
+    session_end and attendance_rate.
+
+    With a seed, each (date, branch) partition is processed on its own with a
+    local random.Random seeded from (seed, branch_id, date), so a partition's
+    result does not depend on which other partitions are processed alongside it,
+    and the module-level `random` state is left untouched.
+    """
+    attendee_sessions = {'session_id': [], 'class_id': [], 'session_start': [], 'session_end': [], 'attendance_rate': []}
+    if member_checkins.empty:
+        return member_checkins.iloc[0:0].assign(**{column: [] for column in attendee_sessions})
+
+    checkin_index = CheckInIntervalIndex(member_checkins)
+    availability = MemberAvailabilityTracker(int(member_checkins['member_id'].max()))
+    min_rates, max_rates = build_class_rate_table(classes_df)
+    checkin_member_ids = member_checkins['member_id'].to_numpy()
+
+    # Attendee rows as check-in positions, plus one entry per session repeated over its attendees
+    attendee_positions = []
+    attendees_per_session = []
+
+    # Group sessions by date (and branch when seeding partitions)
+    partition_keys = ['session_date'] if seed is None else ['session_date', 'branch_id']
+    rng = random
+    for partition, date_sessions in completed_sessions.groupby(partition_keys):
+        if seed is not None:
+            date, partition_branch_id = partition
+            partition_seed = np.random.SeedSequence([seed, int(partition_branch_id), date.toordinal()])
+            rng = random.Random(int(partition_seed.generate_state(1)[0]))
+
+        # Sort sessions by start time
+        sorted_sessions = date_sessions.sort_values('session_start_dt')
+
+        # Track member availability
+        availability.reset()
+
+        for branch_id, session_start, session_end, session_id, capacity, class_id in zip(
+            sorted_sessions['branch_id'].to_numpy(),
+            sorted_sessions['session_start_dt'].to_numpy(),
+            sorted_sessions['session_end_dt'].to_numpy(),
+            sorted_sessions['session_id'].to_numpy(),
+            sorted_sessions['capacity'].to_numpy(),
+            sorted_sessions['class_id'].to_numpy()
+        ):
+            # 1. Find eligible members with valid check-in times
+            eligible_positions = checkin_index.eligible_positions(branch_id, session_start, session_end)
+
+            if len(eligible_positions) == 0:
                 continue
-                
-            # Check time conflict
-            conflict = False
-            for slot in current_status['time_slots']:
-                if not (session_end <= slot[0] or session_start >= slot[1]):
-                    conflict = True
-                    break
-            if not conflict:
-                available_members.append(member_id)
-        
-        # 3. Calculate attendance
-        # attendance_rate = random.uniform(0.7, 0.98)
-        
-
-        session_class_mapping = sessions_df[['session_id', 'class_id']].drop_duplicates()
-        current_class_id = session['class_id']
-        class_type = classes_df[classes_df['class_id'] == current_class_id]['type'].values[0]
-        
-       
-        config = class_type_attendance.get(class_type, class_type_attendance["Default"])
-        attendance_rate = random.uniform(config["min_rate"], config["max_rate"])
-        
-        attendee_count = max(1, min(
-            int(capacity * attendance_rate),
-            len(available_members)
-        ))
-        
-        if attendee_count == 0:
-            continue
-        
-        # 4. Select attendees with preference for less active members
-        selected = random.sample(available_members, attendee_count)
-        
-        # 5. Update member status
-        for member_id in selected:
-            if member_id not in member_status:
-                member_status[member_id] = {
-                    'count': 1,
-                    'time_slots': [(session_start, session_end)]
-                }
+
+            # First check-in of each eligible member, in check-in order
+            eligible_members = checkin_member_ids[eligible_positions]
+            _, first_seen = np.unique(eligible_members, return_index=True)
+            first_seen.sort()
+
+            # 2. Filter members with available time slots
+            available_members = availability.available(eligible_members[first_seen], session_start, session_end)
+
+            # 3. Calculate attendance
+            if class_id < len(min_rates):
+                attendance_rate = rng.uniform(min_rates[class_id], max_rates[class_id])
             else:
-                member_status[member_id]['count'] += 1
-                member_status[member_id]['time_slots'].append((session_start, session_end))
-        
-        session_class_mapping = sessions_df[['session_id', 'class_id']].drop_duplicates()
-
-        # 在处理每个session时：
-        session_attendees = eligible[eligible['member_id'].isin(selected)].drop_duplicates('member_id')
-        session_attendees['session_id'] = session_id
-        session_attendees['class_id'] = session['class_id'] 
-        session_attendees['session_start'] = session_start
-        session_attendees['session_end'] = session_end
-        session_attendees['attendance_rate'] = attendance_rate
-        attendees_list.append(session_attendees)
+                default = class_type_attendance["Default"]
+                attendance_rate = rng.uniform(default["min_rate"], default["max_rate"])
 
-# ------------------------------
-# 6. Combine all attendance records
-# ------------------------------
-attendance_records = pd.concat(attendees_list, ignore_index=True)
+            attendee_count = max(1, min(
+                int(capacity * attendance_rate),
+                len(available_members)
+            ))
 
-# ------------------------------
-# 7. Enforce capacity constraints
-# ------------------------------
-session_capacities = completed_sessions.set_index('session_id')['capacity'].to_dict()
+            # 4. Select attendees with preference for less active members
+            selected = rng.sample(available_members, attendee_count)
+
+            # 5. Update member status
+            availability.book(selected, session_start, session_end)
+
+            rows = eligible_positions[first_seen][np.isin(eligible_members[first_seen], selected)]
+            attendee_positions.append(rows)
+            attendees_per_session.append(len(rows))
+            attendee_sessions['session_id'].append(session_id)
+            attendee_sessions['class_id'].append(class_id)
+            attendee_sessions['session_start'].append(session_start)
+            attendee_sessions['session_end'].append(session_end)
+            attendee_sessions['attendance_rate'].append(attendance_rate)
 
-final_records = []
-for session_id, group in attendance_records.groupby('session_id'):
-    capacity = session_capacities.get(session_id, len(group))
-    final_records.append(group.head(capacity))
+    if not attendee_positions:
+        return member_checkins.iloc[0:0].assign(**{column: [] for column in attendee_sessions})
 
-attendance_records = pd.concat(final_records, ignore_index=True)
+    attendance_records = member_checkins.iloc[np.concatenate(attendee_positions)].reset_index(drop=True)
+    for column, values in attendee_sessions.items():
+        attendance_records[column] = np.repeat(np.array(values), attendees_per_session)
+    return attendance_records
+
+def allocate_attendance_for_branch(task):
+    """
+    Worker for allocate_attendance_parallel: allocate every (date, branch) partition of one branch.
+    """
+    branch_sessions, branch_checkins, classes_df, seed = task
+    return allocate_attendance(branch_sessions, branch_checkins, classes_df, seed=seed)
+
+def allocate_attendance_parallel(completed_sessions, member_checkins, classes_df, seed, workers=None):
+    """
+    Allocate attendance on a process pool.
+
+    Eligibility is branch-local and availability resets every day, so each
+    (branch, date) partition is independent. Partitions are shipped one branch
+    per task, and each is seeded from (seed, branch_id, date). The result is
+    concatenated in branch order and is identical at any worker count.
+    """
+    checkins_by_branch = dict(tuple(member_checkins.groupby('branch_id')))
+    tasks = [
+        (branch_sessions, checkins_by_branch[branch_id], classes_df, seed)
+        for branch_id, branch_sessions in completed_sessions.groupby('branch_id')
+        if branch_id in checkins_by_branch
+    ]
+
+    if workers == 1:
+        results = list(map(allocate_attendance_for_branch, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(allocate_attendance_for_branch, tasks))
+
+    if not results:
+        return allocate_attendance(completed_sessions.iloc[0:0], member_checkins.iloc[0:0], classes_df)
+    return pd.concat(results, ignore_index=True)
 
 # ------------------------------
-# 8. Assign ratings with nulls
+# Ratings
 # ------------------------------
+def stratified_null_mask(strata, null_ratios):
+    """
+    Mark round(null_ratio * n) random rows of every stratum, like
+    group.sample(frac=null_ratio) per group, without building per-group frames.
+
+    strata: integer stratum code per row, -1 for rows that are never picked.
+    null_ratios: ratio per row (constant within a stratum).
+    """
+    n = len(strata)
+    order = np.lexsort((np.random.random(n), strata))
+    sorted_strata = strata[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(sorted_strata)) + 1] if n else np.empty(0, dtype=np.int64)
+    sizes = np.diff(np.r_[starts, n])
+    rank = np.arange(n) - np.repeat(starts, sizes)
+    quota = np.round(null_ratios[order] * np.repeat(sizes, sizes))
+
+    mask = np.zeros(n, dtype=bool)
+    mask[order] = (rank < quota) & (sorted_strata >= 0)
+    return mask
+
+def enforce_session_capacity(attendance_records, completed_sessions):
+    """
+    Keep at most `capacity` attendees per session, in one pass: rows are ordered
+    by session and kept while their cumcount within the session is below the
+    session's capacity (sessions without a known capacity keep every row).
+    """
+    capacities = completed_sessions.drop_duplicates('session_id', keep='last').set_index('session_id')['capacity']
+    records = attendance_records.iloc[np.argsort(attendance_records['session_id'].to_numpy(), kind='stable')]
+    capacity = records['session_id'].map(capacities).fillna(np.inf).to_numpy()
+    within_capacity = records.groupby('session_id').cumcount().to_numpy() < capacity
+    return records[within_capacity].reset_index(drop=True)
+
 def assign_ratings(df):
-    result = []
-    for branch_id, group in df.groupby('branch_id'):
-        null_ratio = random.uniform(0.4, 0.5)
-        group['rating'] = np.random.randint(1, 6, group.shape[0])
-        null_indices = group.sample(frac=null_ratio).index
-        group.loc[null_indices, 'rating'] = np.nan
-        result.append(group)
-    return pd.concat(result)
-
-attendance_records = assign_ratings(attendance_records)
-
-def assign_ranking_with_bias(df):   
+    """
+    Random 1-5 ratings with a branch-specific share (40-50%) nulled.
+    """
+    rated = df.iloc[np.argsort(df['branch_id'].to_numpy(), kind='stable')].copy()
+    branch_codes, branches = pd.factorize(rated['branch_id'], sort=True)
+    null_ratios = np.array([random.uniform(0.4, 0.5) for _ in branches])
+
+    ratings = np.random.randint(1, 6, rated.shape[0]).astype(float)
+    ratings[stratified_null_mask(branch_codes, null_ratios[branch_codes])] = np.nan
+    rated['rating'] = ratings
+    return rated
+
+def assign_ranking_with_bias(df):
+    """
+    Rate every attendance row from its session's attendance rate plus branch and
+    class biases, then null a branch-specific share of each rating bin.
+    Fully vectorised: np.select for the piecewise mean, mapped bias arrays and a
+    single normal draw.
+    """
     unique_branches = df['branch_id'].unique()
     branch_biases = {branch_id: np.random.uniform(-0.5, 0.5) for branch_id in unique_branches}
     
@@ -192,64 +338,163 @@ def assign_ranking_with_bias(df):
             class_biases[class_id] = np.random.uniform(-3.0, 3.0)
         else:
             class_biases[class_id] = np.random.uniform(-1.5, 1.5)
-    
-        result_dfs = []
-    
-    for branch_id, group in df.groupby('branch_id'):
-        total = len(group)
-        branch_bias = branch_biases[branch_id]
-        null_ratio = random.uniform(0.4, 0.5)
-        null_count = int(total * null_ratio)
-        
-
-        ratings = []
-        for idx, row in group.iterrows():
-            att_rate = row['attendance_rate']
-            class_id = row['class_id_x']
-            
-            if att_rate >= 0.8:
-                base_mean = 3.5 + (att_rate - 0.8) * 2.0 / 0.2  # 0.8→3.5分，0.9→4.5分
-            elif att_rate >= 0.6:
-                base_mean = 2.5 + (att_rate - 0.6) * 1.0 / 0.2  # 0.6→2.5分，0.8→3.5分
-            else:
-                base_mean = 1.5 + (att_rate - 0.5) * 1.0 / 0.1  # 0.5→1.5分，0.6→2.5分
-            
-
-            adjusted_mean = base_mean + branch_bias + class_biases[class_id]
-            #class_type = classes_df[classes_df['class_id'] == class_id]['class_type'].values[0]
-            #type_effect = class_type_effect.get(class_type, 0.0)
-            #adjusted_mean = base_mean + branch_bias + class_biases[class_id] + type_effect
-            
-            adjusted_mean = np.clip(adjusted_mean, 1.0, 5.0)
-        
-            rating = np.random.normal(loc=adjusted_mean, scale=0.8)
-            rating = int(round(np.clip(rating, 1, 5)))
-            ratings.append(rating)
-        
-        rated_group = group.copy()
-        rated_group['rating'] = ratings
-        
-        # null_indices = rated_group.sample(n=null_count, random_state=42).index
-        # rated_group.loc[null_indices, 'rating'] = np.nan
-        if not rated_group.empty:
-            bins = pd.cut(rated_group['rating'], bins=[1,2,3,4,5], labels=False)
-            null_indices = rated_group.groupby(bins).sample(frac=null_ratio, random_state=42).index
-            rated_group.loc[null_indices, 'rating'] = np.nan
-        
-        result_dfs.append(rated_group)
-    
-    return pd.concat(result_dfs, ignore_index=True)
 
+    # Rows grouped by branch, original order within a branch
+    rated = df.iloc[np.argsort(df['branch_id'].to_numpy(), kind='stable')].reset_index(drop=True)
+    branch_codes, branches = pd.factorize(rated['branch_id'], sort=True)
+    branch_null_ratios = np.array([random.uniform(0.4, 0.5) for _ in branches])
+
+    att_rate = rated['attendance_rate'].to_numpy()
+    base_mean = np.select(
+        [att_rate >= 0.8, att_rate >= 0.6],
+        [
+            3.5 + (att_rate - 0.8) * 2.0 / 0.2,  # 0.8→3.5分，0.9→4.5分
+            2.5 + (att_rate - 0.6) * 1.0 / 0.2   # 0.6→2.5分，0.8→3.5分
+        ],
+        1.5 + (att_rate - 0.5) * 1.0 / 0.1       # 0.5→1.5分，0.6→2.5分
+    )
+    adjusted_mean = (
+        base_mean
+        + rated['branch_id'].map(branch_biases).to_numpy(dtype=float)
+        + rated['class_id_x'].map(class_biases).to_numpy(dtype=float)
+    )
+    adjusted_mean = np.clip(adjusted_mean, 1.0, 5.0)
+
+    ratings = np.round(np.clip(np.random.normal(loc=adjusted_mean, scale=0.8), 1, 5))
+
+    # Null a share of every (branch, rating bin); bins are (1,2], (2,3], (3,4], (4,5] so 1s are kept
+    bins = pd.cut(ratings, bins=[1, 2, 3, 4, 5], labels=False)
+    bins = np.where(np.isnan(bins), -1, bins).astype(np.int64)
+    strata = np.where(bins >= 0, branch_codes * 4 + bins, -1)
+    null_mask = stratified_null_mask(strata, branch_null_ratios[branch_codes])
+
+    rated['rating'] = np.where(null_mask, np.nan, ratings)
+    return rated
+
+
+# ------------------------------
+# Benchmark
+# ------------------------------
+def benchmark_attendance(num_sessions=100_000, num_branches=50, checkins_per_session=20, seed=0):
+    """
+    Time allocate_attendance on synthetic data and report the cost per session.
+    Sessions are spread over 3 years of days across num_branches branches.
+    """
+    rng = np.random.default_rng(seed)
+    random.seed(seed)
+
+    num_days = 3 * 365
+    days = np.datetime64('2022-01-01') + rng.integers(0, num_days, size=num_sessions).astype('timedelta64[D]')
+    start_slots = np.array([7 * 60, 8 * 60, 9 * 60, 18 * 60, 19 * 60])
+    session_start = days.astype('datetime64[m]') + rng.choice(start_slots, size=num_sessions).astype('timedelta64[m]')
+    sessions = pd.DataFrame({
+        'session_id': np.arange(1, num_sessions + 1),
+        'class_id': rng.integers(1, 9, size=num_sessions),
+        'branch_id': rng.integers(1, num_branches + 1, size=num_sessions),
+        'capacity': rng.choice([10, 15, 20], size=num_sessions),
+        'session_start_dt': pd.to_datetime(session_start),
+        'session_end_dt': pd.to_datetime(session_start + np.timedelta64(45, 'm')),
+    })
+    sessions['session_date'] = sessions['session_start_dt'].dt.date
+
+    # Check-ins that cover each session, spread over the branch's members
+    num_checkins = num_sessions * checkins_per_session
+    covered = rng.integers(0, num_sessions, size=num_checkins)
+    branch_ids = sessions['branch_id'].to_numpy()[covered]
+    members_per_branch = 2000
+    check_in = session_start[covered] - rng.integers(0, 60, size=num_checkins).astype('timedelta64[m]')
+    checkins = pd.DataFrame({
+        'member_id': (branch_ids - 1) * members_per_branch + rng.integers(1, members_per_branch + 1, size=num_checkins),
+        'branch_id': branch_ids,
+        'check_in_time': pd.to_datetime(check_in),
+        'check_out_time': pd.to_datetime(check_in + rng.integers(105, 240, size=num_checkins).astype('timedelta64[m]')),
+    })
+    classes = pd.DataFrame({
+        'class_id': np.arange(1, 9),
+        'type': ['Cardio', 'Cardio', 'Strength', 'Strength', 'Flexibility', 'Flexibility', 'Stretching', 'Stretching'],
+    })
+
+    started = time.perf_counter()
+    attendance = allocate_attendance(sessions, checkins, classes)
+    elapsed = time.perf_counter() - started
+
+    print(f"{num_sessions} sessions, {num_checkins} check-ins -> {len(attendance)} attendees")
+    print(f"total {elapsed:.2f}s, {elapsed / num_sessions * 1e6:.1f} us per session")
+    return elapsed / num_sessions
+
+
+if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark_attendance()
+        sys.exit(0)
+
+    # ------------------------------
+    # 1. Load input data
+    # ------------------------------
+    sessions_df = pd.read_csv('0class_sessions_df.csv')
+    members_df = pd.read_csv('0members.csv')
+    checkins_df = pd.read_csv('0check_ins.csv')
+    classes_df = pd.read_csv('0Class.csv')
+
+    # ------------------------------
+    # 2. Filter 'Completed' sessions
+    # ------------------------------
+    completed_sessions = sessions_df[sessions_df['status'].str.lower() == 'completed'].copy()
+
+    # ------------------------------
+    # 3. Convert datetime columns
+    # ------------------------------
+    completed_sessions['session_start_dt'] = pd.to_datetime(completed_sessions['start_time'])
+    completed_sessions['session_end_dt'] = pd.to_datetime(completed_sessions['end_time'])
+    checkins_df['check_in_time'] = pd.to_datetime(checkins_df['check_in_time'])
+    checkins_df['check_out_time'] = pd.to_datetime(checkins_df['check_out_time'])
+
+    # Add date columns
+    completed_sessions['session_date'] = completed_sessions['session_start_dt'].dt.date
+
+    # ------------------------------
+    # 4. Merge check-ins with members
+    # ------------------------------
+    member_checkins = checkins_df.merge(
+        members_df[['member_id', 'branch_id']],
+        on='member_id',
+        suffixes=('', '_member')
+    )
+
+    # ------------------------------
+    # 5. Process sessions by date
+    # 6. Combine all attendance records
+    # ------------------------------
+    if "--workers" in sys.argv:
+        # Parallel mode: python 3_attendance.py --workers N [--seed S]
+        workers = int(sys.argv[sys.argv.index("--workers") + 1])
+        seed = int(sys.argv[sys.argv.index("--seed") + 1]) if "--seed" in sys.argv else 0
+        attendance_records = allocate_attendance_parallel(completed_sessions, member_checkins, classes_df, seed, workers)
+
+        # Ratings draw from the module RNGs: seed them from the master seed too
+        random.seed(seed)
+        np.random.seed(seed)
+    else:
+        attendance_records = allocate_attendance(completed_sessions, member_checkins, classes_df)
+    session_class_mapping = sessions_df[['session_id', 'class_id']].drop_duplicates()
 
-attendance_records = attendance_records.merge(
-    session_class_mapping,
-    on='session_id',
-    how='left',
-    validate='many_to_one'  
-)
+    # ------------------------------
+    # 7. Enforce capacity constraints
+    # ------------------------------
+    attendance_records = enforce_session_capacity(attendance_records, completed_sessions)
 
+    # ------------------------------
+    # 8. Assign ratings with nulls
+    # ------------------------------
+    attendance_records = assign_ratings(attendance_records)
 
-attendance_records = assign_ranking_with_bias(attendance_records)
+    attendance_records = attendance_records.merge(
+        session_class_mapping,
+        on='session_id',
+        how='left',
+        validate='many_to_one'  
+    )
 
-attendance_records[['member_id', 'session_id', 'rating']].to_csv('0Class_Attendance.csv', index=False)
+    attendance_records = assign_ranking_with_bias(attendance_records)
 
+    attendance_records[['member_id', 'session_id', 'rating']].to_csv('0Class_Attendance.csv', index=False)
@@ -9,9 +9,15 @@ Original file is located at
 # Database Implementation
 
 STEP 1: CREATE the SQLite database;
+
+The *_year / *_month columns are generated from the date text on insert, so reports can
+filter and group on indexed integers instead of calling strftime on every row. They only
+exist in databases created by this cell (CREATE TABLE IF NOT EXISTS leaves older files as they are).
 """
 
+import time
 import sqlite3
+from contextlib import contextmanager
 import pandas as pd
 
 conn = sqlite3.connect("gym_database.db")
@@ -85,6 +91,9 @@ CREATE TABLE IF NOT EXISTS Memberships (
     payment_date TEXT NOT NULL CHECK (payment_date LIKE '____-__-__'),
     payment_amount REAL NOT NULL CHECK (payment_amount >= 0),
     payment_method TEXT NOT NULL,
+    payment_year INTEGER GENERATED ALWAYS AS (CAST(substr(payment_date, 1, 4) AS INTEGER)) STORED,
+    payment_month INTEGER GENERATED ALWAYS AS (CAST(substr(payment_date, 6, 2) AS INTEGER)) STORED,
+    membership_end_year INTEGER GENERATED ALWAYS AS (CAST(substr(membership_end_date, 1, 4) AS INTEGER)) STORED,
     FOREIGN KEY (member_id) REFERENCES members(member_id),
     FOREIGN KEY (membership_type_id) REFERENCES membership_Type(membership_type_id)
 );
@@ -97,6 +106,8 @@ CREATE TABLE IF NOT EXISTS CheckIns (
     checkin_stamp TEXT NOT NULL CHECK (checkin_stamp LIKE '____-__-__ __:__:__'),
     checkout_stamp TEXT CHECK (checkout_stamp LIKE '____-__-__ __:__:__'),
     visit_rating INTEGER CHECK (visit_rating BETWEEN 1 AND 5),
+    checkin_year INTEGER GENERATED ALWAYS AS (CAST(substr(checkin_stamp, 1, 4) AS INTEGER)) STORED,
+    checkin_month INTEGER GENERATED ALWAYS AS (CAST(substr(checkin_stamp, 6, 2) AS INTEGER)) STORED,
     FOREIGN KEY (member_id) REFERENCES members(member_id)
 );
 """)
@@ -110,6 +121,8 @@ CREATE TABLE IF NOT EXISTS Class_Sessions (
     end_time TEXT NOT NULL CHECK (end_time > start_time),
     max_capacity INTEGER CHECK (max_capacity > 0),
     status TEXT NOT NULL CHECK (status IN ('Completed', 'Cancelled')),
+    session_year INTEGER GENERATED ALWAYS AS (CAST(substr(start_time, 1, 4) AS INTEGER)) STORED,
+    session_month INTEGER GENERATED ALWAYS AS (CAST(substr(start_time, 6, 2) AS INTEGER)) STORED,
     FOREIGN KEY (class_id) REFERENCES Class(class_id),
     FOREIGN KEY (trainer_id) REFERENCES Trainers(trainer_id)
 );
@@ -126,6 +139,28 @@ CREATE TABLE IF NOT EXISTS Class_Attendance (
 );
 """)
 
+# Each member's most recent membership, found in one window pass over Memberships
+# (backed by idx_memberships_member_end). Both churn reports read this view: a member
+# churns in the year their last membership ends.
+cursor.execute("""
+CREATE VIEW IF NOT EXISTS Member_Last_Membership AS
+SELECT member_id, membership_id, membership_type_id, membership_end_date, membership_end_year
+FROM (
+    SELECT
+        member_id,
+        membership_id,
+        membership_type_id,
+        membership_end_date,
+        membership_end_year,
+        ROW_NUMBER() OVER (
+            PARTITION BY member_id
+            ORDER BY membership_end_date DESC, membership_id DESC
+        ) AS membership_rank
+    FROM Memberships
+)
+WHERE membership_rank = 1;
+""")
+
 conn.commit()
 
 """STEP 2: Check Tables Created:
@@ -145,7 +180,7 @@ for table_name in tables:
 
 """STEP 3: Upload Files:
 
-Run this box multiple times to upload the relevant csv files. Or drag the files across to the Files window from your desktop.
+Run this box multiple times to upload the relevant csv files (and report_runner.py and simulation_config.py for the reports). Or drag the files across to the Files window from your desktop.
 """
 
 from google.colab import files
@@ -156,42 +191,74 @@ for fn in uploaded.keys():
 
 """STEP 4: Load CSV files into the database tables:"""
 
-branch_df = pd.read_csv('/content/Branch.csv')
-members_df = pd.read_csv('/content/Members.csv')
-membership_types_df = pd.read_csv('/content/Membership_Type.csv')
-memberships_df = pd.read_csv('/content/Memberships.csv')
-trainers_df = pd.read_csv('/content/Trainers.csv')
-classes_df = pd.read_csv('/content/Class.csv')
-class_sessions_df = pd.read_csv('/content/Class_Sessions.csv')
-checkins_df = pd.read_csv('/content/CheckIns.csv')
-class_attendance_df = pd.read_csv('/content/Class_Attendance.csv')
-
-# 3.1 insert Branch
-branch_df.to_sql('Branch', conn, if_exists='append', index=False)
-
-# 3.2 insert Members
-members_df.to_sql('Members', conn, if_exists='append', index=False)
-
-# 3.3 insert Membership_Type
-membership_types_df.to_sql('Membership_Type', conn, if_exists='append', index=False)
-
-# 3.4 insert Memberships
-memberships_df.to_sql('Memberships', conn, if_exists='append', index=False)
-
-# 3.5 insert Trainers
-trainers_df.to_sql('Trainers', conn, if_exists='append', index=False)
-
-# 3.6 insert Class
-classes_df.to_sql('Class', conn, if_exists='append', index=False)
-
-# 3.7 insert Class_Sessions
-class_sessions_df.to_sql('Class_Sessions', conn, if_exists='append', index=False)
-
-# 3.8 insert CheckIns
-checkins_df.to_sql('CheckIns', conn, if_exists='append', index=False)
-
-# 3.9 insert Class_Attendance
-class_attendance_df.to_sql('Class_Attendance', conn, if_exists='append', index=False)
+# Bulk load mode: one transaction per table, chunked executemany and load-time PRAGMAs.
+# Set to False to fall back to DataFrame.to_sql.
+BULK_LOAD = True
+BULK_LOAD_CHUNK_SIZE = 50_000
+
+@contextmanager
+def bulk_load_pragmas(conn, journal_mode='WAL', cache_size_kib=512_000):
+    """
+    Relax durability for the duration of a load and restore the previous settings afterwards.
+    journal_mode='OFF' is faster still, but a failed load can then leave the file corrupt.
+    """
+    conn.commit()  # journal_mode cannot change inside a transaction
+    saved = {name: conn.execute(f"PRAGMA {name}").fetchone()[0]
+             for name in ('journal_mode', 'synchronous', 'cache_size')}
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute(f"PRAGMA cache_size = -{cache_size_kib}")  # negative = KiB
+    try:
+        yield
+    finally:
+        conn.commit()
+        conn.execute(f"PRAGMA journal_mode = {saved['journal_mode']}")
+        conn.execute(f"PRAGMA synchronous = {saved['synchronous']}")
+        conn.execute(f"PRAGMA cache_size = {saved['cache_size']}")
+
+def bulk_load_table(conn, table_name, chunks):
+    """
+    Insert DataFrame chunks (e.g. pd.read_csv(..., chunksize=n)) into an existing
+    table in one transaction with executemany, and report rows/sec. Only one
+    chunk is held in memory at a time. NaN is stored as NULL.
+    """
+    row_count = 0
+    started = time.perf_counter()
+    with conn:  # commits on success, rolls the whole table back on error
+        for chunk in chunks:
+            columns = ', '.join(chunk.columns)
+            placeholders = ', '.join('?' * len(chunk.columns))
+            # object dtype turns numpy scalars into Python values sqlite3 can bind
+            rows = chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+            conn.executemany(f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})", rows)
+            row_count += len(chunk)
+    elapsed = time.perf_counter() - started
+
+    print(f"{table_name}: {row_count} rows in {elapsed:.2f}s ({row_count / max(elapsed, 1e-9):,.0f} rows/sec)")
+    return row_count
+
+# CSVs are streamed in BULK_LOAD_CHUNK_SIZE-row chunks rather than read whole,
+# so memory stays bounded however large CheckIns gets.
+tables_to_load = [
+    ('Branch', '/content/Branch.csv'),                      # 3.1 insert Branch
+    ('Members', '/content/Members.csv'),                    # 3.2 insert Members
+    ('Membership_Type', '/content/Membership_Type.csv'),    # 3.3 insert Membership_Type
+    ('Memberships', '/content/Memberships.csv'),            # 3.4 insert Memberships
+    ('Trainers', '/content/Trainers.csv'),                  # 3.5 insert Trainers
+    ('Class', '/content/Class.csv'),                        # 3.6 insert Class
+    ('Class_Sessions', '/content/Class_Sessions.csv'),      # 3.7 insert Class_Sessions
+    ('CheckIns', '/content/CheckIns.csv'),                  # 3.8 insert CheckIns
+    ('Class_Attendance', '/content/Class_Attendance.csv'),  # 3.9 insert Class_Attendance
+]
+
+if BULK_LOAD:
+    with bulk_load_pragmas(conn):
+        for table_name, csv_path in tables_to_load:
+            bulk_load_table(conn, table_name, pd.read_csv(csv_path, chunksize=BULK_LOAD_CHUNK_SIZE))
+else:
+    for table_name, csv_path in tables_to_load:
+        for chunk in pd.read_csv(csv_path, chunksize=BULK_LOAD_CHUNK_SIZE):
+            chunk.to_sql(table_name, conn, if_exists='append', index=False)
 
 conn.commit()
 
@@ -199,44 +266,141 @@ print("All tables imported successfully!")
 
 """STEP 5: Check Data has loaded"""
 
-# Query all three tables and load into pandas DataFrames
-branch_df = pd.read_sql_query("SELECT * FROM Branch", conn)
-members_df = pd.read_sql_query("SELECT * FROM Members", conn)
-membership_types_df = pd.read_sql_query("SELECT * FROM Membership_Type", conn)
-memberships_df = pd.read_sql_query("SELECT * FROM Memberships", conn)
-trainers_df = pd.read_sql_query("SELECT * FROM Trainers", conn)
-classes_df = pd.read_sql_query("SELECT * FROM Class", conn)
-class_sessions_df = pd.read_sql_query("SELECT * FROM Class_Sessions", conn)
-checkins_df = pd.read_sql_query("SELECT * FROM CheckIns", conn)
-class_attendance_df = pd.read_sql_query("SELECT * FROM Class_Attendance", conn)
+# Count each table and show its first 5 rows, without reading whole tables into memory
+for table_name, _ in tables_to_load:
+    row_count = cursor.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+    print(f"\n{table_name} Table ({row_count} rows):")
+    print(pd.read_sql_query(f"SELECT * FROM {table_name} LIMIT 5", conn))
 
-# Show the first 5 lines of each DataFrame
-print("Branch Table:")
-print(branch_df.head(5))
+"""STEP 6: Create report indexes
 
-print("\nMembers Table:")
-print(members_df.head(5))
+Run after the bulk load (indexes are cheaper to build once than to maintain row by row).
+Each index backs a join or filter in the report queries below; the trailing columns make
+them covering, so the reports read the index without visiting the table.
+"""
 
-print("\nMembership_Type Table:")
-print(membership_types_df.head(5))
+REPORT_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_members_branch ON Members (branch_id)",
+    "CREATE INDEX IF NOT EXISTS idx_memberships_member_end ON Memberships (member_id, membership_end_date, membership_type_id)",
+    "CREATE INDEX IF NOT EXISTS idx_memberships_payment_date ON Memberships (payment_date, payment_year, member_id, membership_type_id, payment_amount)",
+    "CREATE INDEX IF NOT EXISTS idx_checkins_member_stamp ON CheckIns (member_id, checkin_stamp, checkin_year, checkin_month, visit_rating)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_trainer ON Class_Sessions (trainer_id, status, start_time, session_year, class_id, max_capacity)",
+    "CREATE INDEX IF NOT EXISTS idx_attendance_session ON Class_Attendance (session_id, class_rating)",
+]
+
+for index_sql in REPORT_INDEXES:
+    cursor.execute(index_sql)
+cursor.execute("ANALYZE")  # refresh planner statistics
+conn.commit()
 
-print("\nMemberships Table:")
-print(memberships_df.head(5))
+print("Report indexes created and statistics analysed.")
 
-print("\nTrainers Table:")
-print(trainers_df.head(5))
+"""STEP 7: Summary tables
 
-print("\nClasses Table:")
-print(classes_df.head(5))
+Small pre-aggregated tables for the dashboard reports, so they read a few thousand rows
+instead of rescanning CheckIns and Memberships. They are kept in sync by an explicit
+incremental refresh: each source table's highest aggregated rowid is kept in
+Summary_Refresh_State, and only rows above it are folded in (upserted) on the next run.
+Re-run refresh_summaries(conn) after every load. The refresh assumes the source tables
+are append-only; after deleting or editing rows, call it with rebuild=True.
+"""
+
+cursor.executescript("""
+CREATE TABLE IF NOT EXISTS Summary_Refresh_State (
+    source_table TEXT PRIMARY KEY,
+    last_rowid INTEGER NOT NULL
+);
+
+-- visit_rating 0 = check-in without a rating
+CREATE TABLE IF NOT EXISTS Summary_Checkins_Monthly (
+    branch_id INTEGER NOT NULL,
+    checkin_year INTEGER NOT NULL,
+    checkin_month INTEGER NOT NULL,
+    visit_rating INTEGER NOT NULL,
+    total_checkins INTEGER NOT NULL,
+    PRIMARY KEY (branch_id, checkin_year, checkin_month, visit_rating)
+);
 
-print("\nClass_Sessions Table:")
-print(class_sessions_df.head(5))
+-- branch_id 0 = payment for a member not in Members
+CREATE TABLE IF NOT EXISTS Summary_Membership_Sales_Yearly (
+    branch_id INTEGER NOT NULL,
+    membership_type_id INTEGER NOT NULL,
+    payment_year INTEGER NOT NULL,
+    memberships_sold INTEGER NOT NULL,
+    revenue REAL NOT NULL,
+    PRIMARY KEY (branch_id, membership_type_id, payment_year)
+);
 
-print("\nCheckIns Table:")
-print(checkins_df.head(5))
+-- Completed sessions only; branch_id 0 = unknown trainer, class_rating 0 = no rating
+CREATE TABLE IF NOT EXISTS Summary_Class_Attendance_Yearly (
+    branch_id INTEGER NOT NULL,
+    class_id INTEGER NOT NULL,
+    session_year INTEGER NOT NULL,
+    class_rating INTEGER NOT NULL,
+    attendance_count INTEGER NOT NULL,
+    PRIMARY KEY (branch_id, class_id, session_year, class_rating)
+);
+""")
 
-print("\nClass_Attendance Table:")
-print(class_attendance_df.head(5))
+# source table -> (summary table, upsert of the source rows with rowid in (?, ?])
+SUMMARY_REFRESHES = {
+    'CheckIns': ('Summary_Checkins_Monthly', """
+        INSERT INTO Summary_Checkins_Monthly (branch_id, checkin_year, checkin_month, visit_rating, total_checkins)
+        SELECT m.branch_id, c.checkin_year, c.checkin_month, COALESCE(c.visit_rating, 0), COUNT(*)
+        FROM CheckIns c
+        JOIN Members m ON c.member_id = m.member_id
+        WHERE c.rowid > ? AND c.rowid <= ?
+        GROUP BY m.branch_id, c.checkin_year, c.checkin_month, COALESCE(c.visit_rating, 0)
+        ON CONFLICT (branch_id, checkin_year, checkin_month, visit_rating)
+        DO UPDATE SET total_checkins = total_checkins + excluded.total_checkins
+    """),
+    'Memberships': ('Summary_Membership_Sales_Yearly', """
+        INSERT INTO Summary_Membership_Sales_Yearly (branch_id, membership_type_id, payment_year, memberships_sold, revenue)
+        SELECT COALESCE(m.branch_id, 0), ms.membership_type_id, ms.payment_year, COUNT(*), SUM(ms.payment_amount)
+        FROM Memberships ms
+        LEFT JOIN Members m ON ms.member_id = m.member_id
+        WHERE ms.rowid > ? AND ms.rowid <= ?
+        GROUP BY COALESCE(m.branch_id, 0), ms.membership_type_id, ms.payment_year
+        ON CONFLICT (branch_id, membership_type_id, payment_year)
+        DO UPDATE SET memberships_sold = memberships_sold + excluded.memberships_sold,
+                      revenue = revenue + excluded.revenue
+    """),
+    'Class_Attendance': ('Summary_Class_Attendance_Yearly', """
+        INSERT INTO Summary_Class_Attendance_Yearly (branch_id, class_id, session_year, class_rating, attendance_count)
+        SELECT COALESCE(t.branch_id, 0), cs.class_id, cs.session_year, COALESCE(ca.class_rating, 0), COUNT(*)
+        FROM Class_Attendance ca
+        JOIN Class_Sessions cs ON ca.session_id = cs.session_id
+        LEFT JOIN Trainers t ON cs.trainer_id = t.trainer_id
+        WHERE ca.rowid > ? AND ca.rowid <= ? AND cs.status = 'Completed'
+        GROUP BY COALESCE(t.branch_id, 0), cs.class_id, cs.session_year, COALESCE(ca.class_rating, 0)
+        ON CONFLICT (branch_id, class_id, session_year, class_rating)
+        DO UPDATE SET attendance_count = attendance_count + excluded.attendance_count
+    """),
+}
+
+def refresh_summaries(conn, rebuild=False):
+    """Fold source rows added since the last refresh into the summary tables, one transaction."""
+    with conn:
+        if rebuild:
+            conn.execute("DELETE FROM Summary_Refresh_State")
+            for summary_table, _ in SUMMARY_REFRESHES.values():
+                conn.execute(f"DELETE FROM {summary_table}")
+
+        for source_table, (summary_table, upsert_sql) in SUMMARY_REFRESHES.items():
+            state = conn.execute("SELECT last_rowid FROM Summary_Refresh_State WHERE source_table = ?",
+                                 (source_table,)).fetchone()
+            last_rowid = state[0] if state else 0
+            high_water = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {source_table}").fetchone()[0]
+            if high_water <= last_rowid:
+                continue
+            conn.execute(upsert_sql, (last_rowid, high_water))
+            conn.execute("""
+                INSERT INTO Summary_Refresh_State (source_table, last_rowid) VALUES (?, ?)
+                ON CONFLICT (source_table) DO UPDATE SET last_rowid = excluded.last_rowid
+            """, (source_table, high_water))
+            print(f"{summary_table}: folded in {source_table} rows {last_rowid + 1}-{high_water}")
+
+refresh_summaries(conn)
 
 """ONLY RUN IF YOU NEED TO DELETE THE DATA IN THE TABLES
 
@@ -255,6 +419,10 @@ cursor.execute("DELETE FROM Memberships")
 cursor.execute("DELETE FROM CheckIns")
 cursor.execute("DELETE FROM Class_Sessions")
 cursor.execute("DELETE FROM Class_Attendance")
+cursor.execute("DELETE FROM Summary_Checkins_Monthly")
+cursor.execute("DELETE FROM Summary_Membership_Sales_Yearly")
+cursor.execute("DELETE FROM Summary_Class_Attendance_Yearly")
+cursor.execute("DELETE FROM Summary_Refresh_State")
 cursor.execute("PRAGMA foreign_keys = ON")
 
 # Commit the changes
@@ -262,244 +430,44 @@ conn.commit()
 
 print("Database Deleted - restart.")
 
-"""#  Below are the SQL queries."""
-
-# Total Membership Sales by Branch (per Year)
-cursor.execute("""
-  SELECT
-    b.branch_name,
-    strftime('%Y', ms.payment_date) AS payment_year,
-    COUNT(ms.payment_date) AS total_memberships_sold
-  FROM Memberships ms
-  JOIN Members m ON ms.member_id = m.member_id
-  JOIN Branch b ON m.branch_id = b.branch_id
-  WHERE strftime('%Y', ms.payment_date) IN ('2022', '2023', '2024')
-  GROUP BY b.branch_name, payment_year
-  ORDER BY b.branch_name, payment_year;
-""")
-print(cursor.fetchall())
-
-# Trends in Membership Sales by Type
-cursor.execute("""
-  SELECT
-    strftime('%Y', ms.payment_date) AS payment_year,
-    mt.membership_type,
-    COUNT(ms.payment_date) AS total_memberships
-  FROM Memberships ms
-  JOIN Membership_Type mt ON ms.membership_type_id = mt.membership_type_id WHERE strftime('%Y', ms.payment_date) IN ('2022', '2023', '2024')
-  GROUP BY payment_year, mt.membership_type
-  ORDER BY mt.membership_type, payment_year;
-""")
-print(cursor.fetchall())
+"""#  Below are the SQL queries.
 
-# Total Revenue per Membership Type (per Year)
-cursor.execute("""
-  SELECT
-    strftime('%Y', ms.payment_date) AS payment_year,
-    mt.membership_type,
-    SUM(ms.payment_amount) AS total_membership_revenue
-  FROM Memberships ms
-  JOIN Membership_Type mt ON ms.membership_type_id = mt.membership_type_id WHERE strftime('%Y', ms.payment_date) IN ('2022', '2023', '2024')
-  GROUP BY payment_year, mt.membership_type
-  ORDER BY payment_year, mt.membership_type;
-""")
-print(cursor.fetchall())
+The reports live in report_runner.py (upload it with the CSVs in STEP 3): a registry of
+named queries taking a [start, end) date range and an optional branch list, and a runner
+that times each report, records its EXPLAIN QUERY PLAN and caches results until the data
+changes. The range defaults to START_DATE-END_DATE in simulation_config.py, the range the
+data was generated for.
+"""
 
-# Class Popularity by Branch
-cursor.execute("""
-  SELECT
-    b.branch_name,
-    c.class_type,
-    COUNT(ca.member_id) AS total_attendance
-  FROM Class_Attendance ca
-  JOIN Class_Sessions cs ON ca.session_id = cs.session_id
-  JOIN Class c ON cs.class_id = c.class_id
-  JOIN Trainers t ON cs.trainer_id = t.trainer_id
-  JOIN Branch b ON t.branch_id = b.branch_id
-  WHERE strftime('%Y', cs.start_time) IN ('2022', '2023', '2024') AND cs.status = 'Completed'
-  GROUP BY b.branch_name, c.class_type
-  ORDER BY b.branch_name, total_attendance DESC;
-""")
-print(cursor.fetchall())
+from report_runner import ReportRunner, report_names
 
-# Gym Attendance Patterns across Seasons
-cursor.execute("""
-  SELECT
-    b.branch_name,
-    strftime('%Y', c.checkin_stamp) AS year,
-    strftime('%m', c.checkin_stamp) AS month,
-    COUNT(c.checkin_id) AS total_checkins
-  FROM CheckIns c
-  JOIN Members m ON c.member_id = m.member_id
-  JOIN Branch b ON m.branch_id = b.branch_id
-  WHERE strftime('%Y', c.checkin_stamp) IN ('2022', '2023', '2024')
-  GROUP BY b.branch_name, year, month
-  ORDER BY b.branch_name, year, month;
-""")
-print(cursor.fetchall())
+runner = ReportRunner(conn)
 
-# Churn Trends by Branch（2022 -2024)
-cursor.execute("""
-  SELECT
-    b.branch_name,
-    strftime('%Y', ms.membership_end_date) AS membership_end_year,
-    COUNT(DISTINCT m.member_id) AS churned_members
-  FROM Members m
-  JOIN Branch b ON m.branch_id = b.branch_id
-  JOIN Memberships ms ON m.member_id = ms.member_id
-  JOIN (
-    SELECT
-    member_id,
-    MAX(strftime('%Y', membership_end_date)) AS max_end_year
-      FROM Memberships
-      GROUP BY member_id
-    ) AS max_dates ON m.member_id = max_dates.member_id
-  WHERE strftime('%Y', ms.membership_end_date) IN ('2022', '2023', '2024')
-  AND strftime('%Y', ms.membership_end_date) = max_dates.max_end_year
-  GROUP BY membership_end_year, b.branch_name
-  ORDER BY b.branch_name, membership_end_year;
-""")
-print(cursor.fetchall())
+# e.g. runner.run("Gym Attendance Patterns across Seasons", start="2023-01-01", end="2024-01-01", branch_ids=[1, 2])
+for report_name in report_names('raw'):
+    print(f"\n{report_name}")
+    print(runner.run(report_name))
 
-# Churn Trends by Membership Type （2022 -2024）
-cursor.execute("""
-  SELECT
-    b.membership_type,
-    strftime('%Y', ms.membership_end_date) AS membership_end_year,
-    COUNT(DISTINCT m.member_id) AS churned_members
-  FROM Members m
-  JOIN Memberships ms ON m.member_id = ms.member_id
-  JOIN Membership_Type b ON ms.membership_type_id = b.membership_type_id
-  JOIN (
-    SELECT
-    member_id,
-    MAX(strftime('%Y', membership_end_date)) AS max_end_year
-    FROM Memberships
-    GROUP BY member_id
-    ) AS max_dates ON m.member_id = max_dates.member_id
-  WHERE  strftime('%Y', ms.membership_end_date) IN ('2022', '2023', '2024')
-  AND strftime('%Y', ms.membership_end_date) = max_dates.max_end_year
-  GROUP BY membership_end_year, b.membership_type
-  ORDER BY b.membership_type, membership_end_year;
-""")
-print(cursor.fetchall())
+"""Summary-table versions of the dashboard reports (same results, read from the STEP 7 tables).
 
-# Visit Rating by Branch
-cursor.execute("""
-  WITH CheckinCounts AS (
-      SELECT
-          b.branch_name,
-          ci.visit_rating,
-          COUNT(ci.checkin_id) AS rating_count
-      FROM CheckIns ci
-      JOIN Members m ON ci.member_id = m.member_id
-      JOIN Branch b ON m.branch_id = b.branch_id
-      WHERE strftime('%Y', ci.checkin_stamp) IN ('2022', '2023', '2024')
-        AND ci.visit_rating IS NOT NULL
-      GROUP BY b.branch_name, ci.visit_rating
-  ),
-  BranchTotal AS (
-      SELECT
-          branch_name,
-          count(*) AS total_checkins
-      FROM CheckIns ci
-      JOIN Members m ON ci.member_id = m.member_id
-      JOIN Branch b ON m.branch_id = b.branch_id
-      WHERE strftime('%Y', ci.checkin_stamp) IN ('2022', '2023', '2024')
-        AND ci.visit_rating IS NOT NULL
-      GROUP BY branch_name
-  )
-  SELECT
-      c.branch_name,
-      c.visit_rating,
-      c.rating_count * 1.0 / b.total_checkins *100 AS rating_percentage
-  FROM CheckinCounts c
-  JOIN BranchTotal b ON c.branch_name = b.branch_name
-  ORDER BY c.branch_name, c.visit_rating;
-""")
-print(cursor.fetchall())
-
-# Average Visit Ranking by Branch
-cursor.execute("""
-  SELECT
-    b.branch_name AS branch_name,
-    ROUND(AVG(c.visit_rating), 3) AS avg_visit_rating
-  FROM CheckIns c
-  JOIN Members m ON c.member_id = m.member_id
-  JOIN Branch b ON m.branch_id = b.branch_id
-  WHERE strftime('%Y', c.checkin_stamp) IN ('2022', '2023', '2024')
-    AND c.visit_rating IS NOT NULL
-  GROUP BY b.branch_name
-  ORDER BY avg_visit_rating DESC;
-""")
-print(cursor.fetchall())
+Run refresh_summaries(conn) first if data has been loaded since the last refresh. The
+summaries hold whole months (check-ins) or years (sales, classes), so a range passed to
+these reports must start and end on the first day of one, or run() raises ValueError.
+"""
 
-# Average Session Attendance Rates By Branch
-cursor.execute("""
-  SELECT
-      b.branch_name,
-      ROUND(AVG(1.0 * COALESCE(attendance_count, 0) / max_capacity), 4) AS avg_attendance_rate
-  FROM Class_Sessions cs
-  JOIN Trainers t ON cs.trainer_id = t.trainer_id
-  JOIN Branch b ON t.branch_id = b.branch_id
-  LEFT JOIN (
-      SELECT
-          session_id,
-          COUNT(*) AS attendance_count
-      FROM Class_Attendance
-      GROUP BY session_id
-  ) ca ON cs.session_id = ca.session_id
-  WHERE cs.status = 'Completed'
-  GROUP BY b.branch_name;
-""")
-print(cursor.fetchall())
+for report_name in report_names('summary'):
+    print(f"\n{report_name}")
+    print(runner.run(report_name))
 
-# Average Session Attendance Rates By Class
-cursor.execute("""
-  SELECT
-      c.class_type,
-      c.class_name,
-      ROUND(AVG(1.0 * COALESCE(attendance_count, 0) / max_capacity), 4) AS avg_attendance_rate
-  FROM Class_Sessions cs
-  JOIN Class c ON cs.class_id = c.class_id
-  LEFT JOIN (
-      SELECT
-          session_id,
-          COUNT(*) AS attendance_count
-      FROM Class_Attendance
-      GROUP BY session_id
-  ) ca ON cs.session_id = ca.session_id
-  WHERE cs.status = 'Completed'
-  GROUP BY c.class_id
-  ORDER BY c.class_type, c.class_name;
-""")
-print(cursor.fetchall())
+"""Query plans: execution time and EXPLAIN QUERY PLAN recorded for every report and shared setup, with full table scans flagged.
 
-# # Average Session Rating By Class
-cursor.execute("""
-    SELECT
-        c.class_type,
-        c.class_name,
-        ROUND(AVG(class_rating), 3) AS avg_session_rating
-    FROM Class_Sessions cs
-    JOIN Class c ON cs.class_id = c.class_id
-    JOIN Class_Attendance ca ON cs.session_id = ca.session_id
-    WHERE cs.status = 'Completed'
-    GROUP BY c.class_type, c.class_name
-    ORDER BY c.class_type, c.class_name;
-""")
-print(cursor.fetchall())
+A SCAN on a big table without an index means a report is missing one of the STEP 6 indexes.
+"""
 
-# Average Session Rating By Branch
-cursor.execute("""
-  SELECT
-      b.branch_name,
-      ROUND(AVG(class_rating), 4) AS avg_session_rating
-  FROM Class_Sessions cs
-  JOIN Trainers t ON cs.trainer_id = t.trainer_id
-  JOIN Branch b ON t.branch_id = b.branch_id
-  JOIN Class_Attendance ca ON cs.session_id = ca.session_id
-  WHERE cs.status = 'Completed'
-  GROUP BY b.branch_name;
-""")
-print(cursor.fetchall())
\ No newline at end of file
+plan_warnings = runner.plan_warnings()
+for report_name, plan in runner.plans.items():
+    print(f"\n{report_name} ({runner.timings[report_name] * 1000:.1f} ms)")
+    for _, _, detail in plan:
+        print(f"  {detail}")
+    for detail in plan_warnings.get(report_name, []):
+        print(f"  WARNING full scan: {detail}")
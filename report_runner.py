@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Report registry and runner for the gym database built by SQL_DDL_Queries.py.
+
+Every report is a named SQL query taking the same named parameters:
+    :start_date, :end_date      ISO dates bounding the half-open range [start, end),
+                                compared directly against the indexed date/stamp columns
+    :start_year, :end_year      the same range in whole years, for the yearly summary tables
+    :start_period, :end_period  the same range in whole months as YYYYMM, for the monthly one
+    :branch_ids                 JSON list of branch ids, or NULL for every branch
+
+Summary reports can only answer whole periods: ReportRunner raises ValueError when
+the range does not start and end on a month (monthly) or year (yearly) boundary.
+
+The default range is the generators' simulated range from simulation_config.py.
+
+ReportRunner executes reports and their shared setups, records their execution
+time and EXPLAIN QUERY PLAN, and caches results until the data changes.
+"""
+
+import json
+import re
+import time
+from datetime import date, datetime, timedelta
+from simulation_config import START_DATE, END_DATE
+
+# Small tables it is fine to scan in full
+LOOKUP_TABLES = {'Branch', 'Class', 'Membership_Type', 'Trainers'}
+
+# name -> {'sql': report query, 'setup': name in REPORT_SETUPS or None, 'source': 'raw' or 'summary',
+#          'granularity': None, or 'month'/'year' for summary reports}
+REPORTS = {}
+
+# Statements run with the report's parameters before the reports that need them
+REPORT_SETUPS = {}
+
+
+def branch_filter(column):
+    """SQL predicate keeping rows whose branch id column is in :branch_ids (all rows when NULL)."""
+    return f"(:branch_ids IS NULL OR {column} IN (SELECT value FROM json_each(:branch_ids)))"
+
+
+def year_filter(column):
+    """SQL predicate keeping rows whose year column is in [:start_year, :end_year)."""
+    return f"{column} >= :start_year AND {column} < :end_year"
+
+
+def month_filter(year_column, month_column):
+    """SQL predicate keeping rows whose year/month columns are in [:start_period, :end_period)."""
+    period = f"({year_column} * 100 + {month_column})"
+    return f"{period} >= :start_period AND {period} < :end_period"
+
+
+def register_report(name, sql, setup=None, source='raw', granularity=None):
+    """
+    Add a report to the registry; setup names an entry of REPORT_SETUPS to run first.
+    granularity is the period ('month' or 'year') a summary report's table is kept at.
+    """
+    REPORTS[name] = {'sql': sql, 'setup': setup, 'source': source, 'granularity': granularity}
+
+
+def report_names(source='raw'):
+    """Registered report names reading from 'raw' tables or from the 'summary' tables."""
+    return [name for name, report in REPORTS.items() if report['source'] == source]
+
+
+def to_date(value):
+    """date from a date, datetime or ISO 'YYYY-MM-DD' string."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def report_params(start=None, end=None, branch_ids=None):
+    """
+    Named parameters for a report run over [start, end).
+
+    start defaults to START_DATE and end to the day after END_DATE; both accept a
+    date, datetime or ISO string. branch_ids is any iterable of ids, or None for all.
+    The year and period bounds are those of the years/months start and end fall in,
+    an end that is not the first day of its year/month being rounded up.
+    """
+    start = to_date(start) if start is not None else START_DATE.date()
+    end = to_date(end) if end is not None else END_DATE.date() + timedelta(days=1)
+    end_month = end.year * 12 + end.month - 1 + (end.day != 1)  # months since year 0
+    return {
+        'start_date': start.isoformat(),
+        'end_date': end.isoformat(),
+        'start_year': start.year,
+        'end_year': end.year + ((end.month, end.day) != (1, 1)),
+        'start_period': start.year * 100 + start.month,
+        'end_period': end_month // 12 * 100 + end_month % 12 + 1,
+        'branch_ids': None if branch_ids is None else json.dumps(sorted(int(b) for b in branch_ids)),
+    }
+
+
+def check_granularity(params, granularity):
+    """Raise ValueError unless the range in params starts and ends on a granularity boundary."""
+    for key in ('start_date', 'end_date'):
+        day = date.fromisoformat(params[key])
+        if day.day != 1 or (granularity == 'year' and day.month != 1):
+            raise ValueError(f"{key} {day} is not the first day of a {granularity}: "
+                             f"this summary report covers whole {granularity}s only")
+
+
+# --- Shared setup ---
+# The visit-rating histogram is aggregated from CheckIns once; both rating reports read it.
+REPORT_SETUPS['visit_rating_histogram'] = [
+    "DROP TABLE IF EXISTS temp.Visit_Rating_Histogram",
+    f"""
+  CREATE TEMP TABLE Visit_Rating_Histogram AS
+  SELECT
+      b.branch_name,
+      ci.visit_rating,
+      COUNT(ci.checkin_id) AS rating_count
+  FROM CheckIns ci
+  JOIN Members m ON ci.member_id = m.member_id
+  JOIN Branch b ON m.branch_id = b.branch_id
+  WHERE ci.checkin_stamp >= :start_date AND ci.checkin_stamp < :end_date
+    AND ci.visit_rating IS NOT NULL
+    AND {branch_filter('b.branch_id')}
+  GROUP BY b.branch_name, ci.visit_rating
+""",
+]
+
+MEMBER_IN_BRANCHES = f"(SELECT member_id FROM Members WHERE {branch_filter('branch_id')})"
+TRAINER_IN_BRANCHES = f"(SELECT trainer_id FROM Trainers WHERE {branch_filter('branch_id')})"
+
+# --- Reports over the raw tables ---
+register_report("Total Membership Sales by Branch (per Year)", f"""
+  SELECT
+    b.branch_name,
+    ms.payment_year,
+    COUNT(ms.payment_date) AS total_memberships_sold
+  FROM Memberships ms
+  JOIN Members m ON ms.member_id = m.member_id
+  JOIN Branch b ON m.branch_id = b.branch_id
+  WHERE ms.payment_date >= :start_date AND ms.payment_date < :end_date
+    AND {branch_filter('m.branch_id')}
+  GROUP BY b.branch_name, ms.payment_year
+  ORDER BY b.branch_name, ms.payment_year;
+""")
+
+register_report("Trends in Membership Sales by Type", f"""
+  SELECT
+    ms.payment_year,
+    mt.membership_type,
+    COUNT(ms.payment_date) AS total_memberships
+  FROM Memberships ms
+  JOIN Membership_Type mt ON ms.membership_type_id = mt.membership_type_id
+  WHERE ms.payment_date >= :start_date AND ms.payment_date < :end_date
+    AND (:branch_ids IS NULL OR ms.member_id IN {MEMBER_IN_BRANCHES})
+  GROUP BY ms.payment_year, mt.membership_type
+  ORDER BY mt.membership_type, ms.payment_year;
+""")
+
+register_report("Total Revenue per Membership Type (per Year)", f"""
+  SELECT
+    ms.payment_year,
+    mt.membership_type,
+    SUM(ms.payment_amount) AS total_membership_revenue
+  FROM Memberships ms
+  JOIN Membership_Type mt ON ms.membership_type_id = mt.membership_type_id
+  WHERE ms.payment_date >= :start_date AND ms.payment_date < :end_date
+    AND (:branch_ids IS NULL OR ms.member_id IN {MEMBER_IN_BRANCHES})
+  GROUP BY ms.payment_year, mt.membership_type
+  ORDER BY ms.payment_year, mt.membership_type;
+""")
+
+register_report("Class Popularity by Branch", f"""
+  SELECT
+    b.branch_name,
+    c.class_type,
+    COUNT(ca.member_id) AS total_attendance
+  FROM Class_Attendance ca
+  JOIN Class_Sessions cs ON ca.session_id = cs.session_id
+  JOIN Class c ON cs.class_id = c.class_id
+  JOIN Trainers t ON cs.trainer_id = t.trainer_id
+  JOIN Branch b ON t.branch_id = b.branch_id
+  WHERE cs.start_time >= :start_date AND cs.start_time < :end_date AND cs.status = 'Completed'
+    AND {branch_filter('t.branch_id')}
+  GROUP BY b.branch_name, c.class_type
+  ORDER BY b.branch_name, total_attendance DESC;
+""")
+
+register_report("Gym Attendance Patterns across Seasons", f"""
+  SELECT
+    b.branch_name,
+    c.checkin_year AS year,
+    c.checkin_month AS month,
+    COUNT(c.checkin_id) AS total_checkins
+  FROM CheckIns c
+  JOIN Members m ON c.member_id = m.member_id
+  JOIN Branch b ON m.branch_id = b.branch_id
+  WHERE c.checkin_stamp >= :start_date AND c.checkin_stamp < :end_date
+    AND {branch_filter('m.branch_id')}
+  GROUP BY b.branch_name, year, month
+  ORDER BY b.branch_name, year, month;
+""")
+
+register_report("Churn Trends by Branch", f"""
+  SELECT
+    b.branch_name,
+    lm.membership_end_year,
+    COUNT(*) AS churned_members
+  FROM Member_Last_Membership lm
+  JOIN Members m ON lm.member_id = m.member_id
+  JOIN Branch b ON m.branch_id = b.branch_id
+  WHERE lm.membership_end_date >= :start_date AND lm.membership_end_date < :end_date
+    AND {branch_filter('m.branch_id')}
+  GROUP BY lm.membership_end_year, b.branch_name
+  ORDER BY b.branch_name, lm.membership_end_year;
+""")
+
+register_report("Churn Trends by Membership Type", f"""
+  SELECT
+    b.membership_type,
+    lm.membership_end_year,
+    COUNT(*) AS churned_members
+  FROM Member_Last_Membership lm
+  JOIN Members m ON lm.member_id = m.member_id
+  JOIN Membership_Type b ON lm.membership_type_id = b.membership_type_id
+  WHERE lm.membership_end_date >= :start_date AND lm.membership_end_date < :end_date
+    AND {branch_filter('m.branch_id')}
+  GROUP BY lm.membership_end_year, b.membership_type
+  ORDER BY b.membership_type, lm.membership_end_year;
+""")
+
+register_report("Visit Rating by Branch", """
+  SELECT
+      h.branch_name,
+      h.visit_rating,
+      h.rating_count * 1.0 / SUM(h.rating_count) OVER (PARTITION BY h.branch_name) *100 AS rating_percentage
+  FROM Visit_Rating_Histogram h
+  ORDER BY h.branch_name, h.visit_rating;
+""", setup='visit_rating_histogram')
+
+register_report("Average Visit Ranking by Branch", """
+  SELECT
+    h.branch_name AS branch_name,
+    ROUND(SUM(h.visit_rating * h.rating_count) * 1.0 / SUM(h.rating_count), 3) AS avg_visit_rating
+  FROM Visit_Rating_Histogram h
+  GROUP BY h.branch_name
+  ORDER BY avg_visit_rating DESC;
+""", setup='visit_rating_histogram')
+
+register_report("Average Session Attendance Rates By Branch", f"""
+  SELECT
+      b.branch_name,
+      ROUND(AVG(1.0 * COALESCE(attendance_count, 0) / max_capacity), 4) AS avg_attendance_rate
+  FROM Class_Sessions cs
+  JOIN Trainers t ON cs.trainer_id = t.trainer_id
+  JOIN Branch b ON t.branch_id = b.branch_id
+  LEFT JOIN (
+      SELECT
+          session_id,
+          COUNT(*) AS attendance_count
+      FROM Class_Attendance
+      GROUP BY session_id
+  ) ca ON cs.session_id = ca.session_id
+  WHERE cs.status = 'Completed'
+    AND cs.start_time >= :start_date AND cs.start_time < :end_date
+    AND {branch_filter('t.branch_id')}
+  GROUP BY b.branch_name;
+""")
+
+register_report("Average Session Attendance Rates By Class", f"""
+  SELECT
+      c.class_type,
+      c.class_name,
+      ROUND(AVG(1.0 * COALESCE(attendance_count, 0) / max_capacity), 4) AS avg_attendance_rate
+  FROM Class_Sessions cs
+  JOIN Class c ON cs.class_id = c.class_id
+  LEFT JOIN (
+      SELECT
+          session_id,
+          COUNT(*) AS attendance_count
+      FROM Class_Attendance
+      GROUP BY session_id
+  ) ca ON cs.session_id = ca.session_id
+  WHERE cs.status = 'Completed'
+    AND cs.start_time >= :start_date AND cs.start_time < :end_date
+    AND (:branch_ids IS NULL OR cs.trainer_id IN {TRAINER_IN_BRANCHES})
+  GROUP BY c.class_id
+  ORDER BY c.class_type, c.class_name;
+""")
+
+register_report("Average Session Rating By Class", f"""
+    SELECT
+        c.class_type,
+        c.class_name,
+        ROUND(AVG(class_rating), 3) AS avg_session_rating
+    FROM Class_Sessions cs
+    JOIN Class c ON cs.class_id = c.class_id
+    JOIN Class_Attendance ca ON cs.session_id = ca.session_id
+    WHERE cs.status = 'Completed'
+      AND cs.start_time >= :start_date AND cs.start_time < :end_date
+      AND (:branch_ids IS NULL OR cs.trainer_id IN {TRAINER_IN_BRANCHES})
+    GROUP BY c.class_type, c.class_name
+    ORDER BY c.class_type, c.class_name;
+""")
+
+register_report("Average Session Rating By Branch", f"""
+  SELECT
+      b.branch_name,
+      ROUND(AVG(class_rating), 4) AS avg_session_rating
+  FROM Class_Sessions cs
+  JOIN Trainers t ON cs.trainer_id = t.trainer_id
+  JOIN Branch b ON t.branch_id = b.branch_id
+  JOIN Class_Attendance ca ON cs.session_id = ca.session_id
+  WHERE cs.status = 'Completed'
+    AND cs.start_time >= :start_date AND cs.start_time < :end_date
+    AND {branch_filter('t.branch_id')}
+  GROUP BY b.branch_name;
+""")
+
+# --- Reports over the summary tables (STEP 7 of SQL_DDL_Queries.py) ---
+# The summaries are yearly or monthly, so these filter on whole years or months.
+register_report("Total Membership Sales by Branch (per Year) (summary)", f"""
+  SELECT b.branch_name, s.payment_year, SUM(s.memberships_sold) AS total_memberships_sold
+  FROM Summary_Membership_Sales_Yearly s
+  JOIN Branch b ON s.branch_id = b.branch_id
+  WHERE {year_filter('s.payment_year')} AND {branch_filter('s.branch_id')}
+  GROUP BY b.branch_name, s.payment_year
+  ORDER BY b.branch_name, s.payment_year;
+""", source='summary', granularity='year')
+
+register_report("Trends in Membership Sales by Type (summary)", f"""
+  SELECT s.payment_year, mt.membership_type, SUM(s.memberships_sold) AS total_memberships
+  FROM Summary_Membership_Sales_Yearly s
+  JOIN Membership_Type mt ON s.membership_type_id = mt.membership_type_id
+  WHERE {year_filter('s.payment_year')} AND {branch_filter('s.branch_id')}
+  GROUP BY s.payment_year, mt.membership_type
+  ORDER BY mt.membership_type, s.payment_year;
+""", source='summary', granularity='year')
+
+register_report("Total Revenue per Membership Type (per Year) (summary)", f"""
+  SELECT s.payment_year, mt.membership_type, SUM(s.revenue) AS total_membership_revenue
+  FROM Summary_Membership_Sales_Yearly s
+  JOIN Membership_Type mt ON s.membership_type_id = mt.membership_type_id
+  WHERE {year_filter('s.payment_year')} AND {branch_filter('s.branch_id')}
+  GROUP BY s.payment_year, mt.membership_type
+  ORDER BY s.payment_year, mt.membership_type;
+""", source='summary', granularity='year')
+
+register_report("Class Popularity by Branch (summary)", f"""
+  SELECT b.branch_name, c.class_type, SUM(s.attendance_count) AS total_attendance
+  FROM Summary_Class_Attendance_Yearly s
+  JOIN Class c ON s.class_id = c.class_id
+  JOIN Branch b ON s.branch_id = b.branch_id
+  WHERE {year_filter('s.session_year')} AND {branch_filter('s.branch_id')}
+  GROUP BY b.branch_name, c.class_type
+  ORDER BY b.branch_name, total_attendance DESC;
+""", source='summary', granularity='year')
+
+register_report("Gym Attendance Patterns across Seasons (summary)", f"""
+  SELECT b.branch_name, s.checkin_year AS year, s.checkin_month AS month, SUM(s.total_checkins) AS total_checkins
+  FROM Summary_Checkins_Monthly s
+  JOIN Branch b ON s.branch_id = b.branch_id
+  WHERE {month_filter('s.checkin_year', 's.checkin_month')} AND {branch_filter('s.branch_id')}
+  GROUP BY b.branch_name, year, month
+  ORDER BY b.branch_name, year, month;
+""", source='summary', granularity='month')
+
+register_report("Visit Rating by Branch (summary)", f"""
+  SELECT b.branch_name, s.visit_rating,
+    SUM(s.total_checkins) * 1.0 / SUM(SUM(s.total_checkins)) OVER (PARTITION BY b.branch_name) * 100 AS rating_percentage
+  FROM Summary_Checkins_Monthly s
+  JOIN Branch b ON s.branch_id = b.branch_id
+  WHERE {month_filter('s.checkin_year', 's.checkin_month')} AND s.visit_rating > 0
+    AND {branch_filter('s.branch_id')}
+  GROUP BY b.branch_name, s.visit_rating
+  ORDER BY b.branch_name, s.visit_rating;
+""", source='summary', granularity='month')
+
+register_report("Average Visit Ranking by Branch (summary)", f"""
+  SELECT b.branch_name AS branch_name,
+    ROUND(SUM(s.visit_rating * s.total_checkins) * 1.0 / SUM(s.total_checkins), 3) AS avg_visit_rating
+  FROM Summary_Checkins_Monthly s
+  JOIN Branch b ON s.branch_id = b.branch_id
+  WHERE {month_filter('s.checkin_year', 's.checkin_month')} AND s.visit_rating > 0
+    AND {branch_filter('s.branch_id')}
+  GROUP BY b.branch_name
+  ORDER BY avg_visit_rating DESC;
+""", source='summary', granularity='month')
+
+register_report("Average Session Rating By Class (summary)", f"""
+  SELECT c.class_type, c.class_name,
+    ROUND(SUM(s.class_rating * s.attendance_count) * 1.0 / SUM(s.attendance_count), 3) AS avg_session_rating
+  FROM Summary_Class_Attendance_Yearly s
+  JOIN Class c ON s.class_id = c.class_id
+  WHERE {year_filter('s.session_year')} AND s.class_rating > 0
+    AND {branch_filter('s.branch_id')}
+  GROUP BY c.class_type, c.class_name
+  ORDER BY c.class_type, c.class_name;
+""", source='summary', granularity='year')
+
+register_report("Average Session Rating By Branch (summary)", f"""
+  SELECT b.branch_name,
+    ROUND(SUM(s.class_rating * s.attendance_count) * 1.0 / SUM(s.attendance_count), 4) AS avg_session_rating
+  FROM Summary_Class_Attendance_Yearly s
+  JOIN Branch b ON s.branch_id = b.branch_id
+  WHERE {year_filter('s.session_year')} AND s.class_rating > 0
+    AND {branch_filter('s.branch_id')}
+  GROUP BY b.branch_name;
+""", source='summary', granularity='year')
+
+
+# --- Query plans ---
+def explain_report(conn, report_sql, params):
+    """EXPLAIN QUERY PLAN rows for a report, as (id, parent, detail) tuples."""
+    return [(row[0], row[1], row[3]) for row in conn.execute("EXPLAIN QUERY PLAN " + report_sql, params)]
+
+
+def full_scans(conn, report_sql, plan):
+    """
+    Plan steps that read a whole non-lookup table rather than an index.
+    SCANs over lookup tables, the (small) Summary_* tables and materialised
+    subqueries/CTEs are fine.
+    """
+    table_names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    # Plans name tables by alias: map "FROM CheckIns c" / "JOIN Members m" back to the table
+    aliases = {}
+    for table, alias in re.findall(r'(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', report_sql, re.IGNORECASE):
+        if table in table_names and not table.startswith('Summary_'):
+            aliases[table] = table
+            if alias and alias.upper() not in ('ON', 'WHERE', 'JOIN', 'GROUP', 'LEFT', 'USING'):
+                aliases[alias] = table
+    return [
+        detail for _, _, detail in plan
+        if detail.startswith('SCAN ') and 'INDEX' not in detail
+        and aliases.get(detail.split()[1]) not in LOOKUP_TABLES | {None}
+    ]
+
+
+# --- Runner ---
+class ReportRunner:
+    """
+    Run registered reports on one connection, recording per report the last
+    execution time (timings), EXPLAIN QUERY PLAN (plans) and whether it was
+    served from cache (cache_hits). Shared setups get timings and plans too,
+    under their REPORT_SETUPS name, as they do the heavy lifting of their reports.
+
+    Results are cached on (query, parameters, data version). The data version is
+    PRAGMA data_version, which moves when another connection commits, plus this
+    connection's total_changes, which moves on its own writes, so a repeated
+    dashboard refresh is answered from memory until new data is loaded.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cache = {}
+        self.cache_version = None
+        self.prepared = {}  # setup name -> (params, data version) it was last built for
+        self.timings = {}
+        self.plans = {}
+        self.cache_hits = {}
+
+    def data_version(self):
+        """Token that changes whenever the database contents change."""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0], self.conn.total_changes
+
+    def prepare(self, setup_name, params, version):
+        """Build a shared setup for these parameters unless it is already current."""
+        key = (tuple(sorted(params.items())), version)
+        if self.prepared.get(setup_name) == key:
+            return
+        plan = []
+        elapsed = 0.0
+        for statement in REPORT_SETUPS[setup_name]:
+            # Explained before it runs: a CREATE no longer compiles once its table exists
+            plan += explain_report(self.conn, statement, params)
+            started = time.perf_counter()
+            self.conn.execute(statement, params)
+            elapsed += time.perf_counter() - started
+        self.timings[setup_name] = elapsed
+        self.plans[setup_name] = plan
+        self.prepared[setup_name] = key
+
+    def run(self, name, **params):
+        """Rows of one report; keyword arguments as report_params()."""
+        report = REPORTS[name]
+        params = report_params(**params)
+        if report['granularity']:
+            check_granularity(params, report['granularity'])
+        version = self.data_version()
+        if version != self.cache_version:
+            self.cache.clear()
+            self.cache_version = version
+
+        cache_key = (report['sql'], tuple(sorted(params.items())))
+        if cache_key in self.cache:
+            self.cache_hits[name] = True
+            return self.cache[cache_key]
+
+        started = time.perf_counter()
+        if report['setup']:
+            self.prepare(report['setup'], params, version)
+        rows = self.conn.execute(report['sql'], params).fetchall()
+        self.timings[name] = time.perf_counter() - started
+        self.plans[name] = explain_report(self.conn, report['sql'], params)
+        self.cache_hits[name] = False
+        self.cache[cache_key] = rows
+        return rows
+
+    def run_all(self, source='raw', **params):
+        """Run every report of a source ('raw' or 'summary'); returns {name: rows}."""
+        return {name: self.run(name, **params) for name in report_names(source)}
+
+    def plan_warnings(self):
+        """{report or setup name: full scans} for those whose last plan scans a big table."""
+        warnings = {}
+        for name, plan in self.plans.items():
+            sql = REPORTS[name]['sql'] if name in REPORTS else "\n".join(REPORT_SETUPS[name])
+            scans = full_scans(self.conn, sql, plan)
+            if scans:
+                warnings[name] = scans
+        return warnings
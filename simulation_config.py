@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simulation date range shared by the generator scripts and the reports.
+
+Extend the simulation by moving these bounds: the generators simulate from
+START_DATE to END_DATE and the reports default to the same range.
+"""
+
+from datetime import datetime
+
+START_DATE = datetime(2022, 1, 1)
+END_DATE = datetime(2024, 12, 31, 23, 59, 59)